@@ -7,13 +7,18 @@ from vault.tenant.enable_tenant import EnableNewTenant
 from vault.tenant.disable_tenant import DisableTenant
 from vault.user.add_user import UserAdd
 from vault.user.delete_user import UserDelete
+from vault.user.import_users import UserImport
+from vault.user.user_index import UserIndex
 from vault.policies.add_policies import AddPolicies
 from vault.policies.delete_policies import DeletePolicies
 from vault.policies.update_policies import UpdatePolicies
+from vault.policies.render_policies import parse_orgs
 from vault.backup_import.backupconfig import Backup
+from vault.backup_import.importconfig import ImportConfig
+from vault.backup_import.archive import BackupArchive, is_archive
 from vault.config.delete_config import DeleteConfig
 from vault.config.read_config import ReadConfig
-from vault.config.write_config import WriteConfig
+from vault.config.write_config import WriteConfig, read_platform_manifest
 
 logger = logging.getLogger("Babylon")
 
@@ -59,6 +64,17 @@ def main():
         help="Specify the version of engine, default: v2",
         choices=["v1", "v2"],
     )
+    parser_read.add_argument(
+        "--no-state-cache",
+        action="store_true",
+        help="Always download the terraform state instead of using the local cache",
+    )
+    parser_read.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of concurrent Vault reads when --resource is 'all', default: 8",
+    )
 
     # 'write' subcommand under 'config'
     parser_write = config_subparsers.add_parser("write", help="Write configuration")
@@ -71,7 +87,12 @@ def main():
         choices=["v1", "v2"],
     )
     parser_write.add_argument(
-        "--platform-id", required=True, help="Platform ID to delete config"
+        "--platform-id",
+        help="Platform ID to write config, or a comma-separated list of platform IDs",
+    )
+    parser_write.add_argument(
+        "--platforms-file",
+        help="Path to a YAML/JSON manifest listing the platform IDs to write config",
     )
     parser_write.add_argument("--file", help="Path to local state file (optional)")
     parser_write.add_argument(
@@ -84,6 +105,26 @@ def main():
         action="store_true",
         help="Use terraform state file as data source",
     )
+    parser_write.add_argument(
+        "--no-state-cache",
+        action="store_true",
+        help="Always download the terraform state instead of using the local cache",
+    )
+    parser_write.add_argument(
+        "--skip-unchanged",
+        action="store_true",
+        help="Only write the paths whose content differs from what is in Vault",
+    )
+    parser_write.add_argument(
+        "--mapping-file",
+        help="Path to a YAML file mapping terraform outputs to Vault secrets (optional)",
+    )
+    parser_write.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="Number of concurrent Vault writes for 'all' or several platforms, default: 1",
+    )
 
     # 'delete' subcommand under 'config'
     parser_delete = config_subparsers.add_parser(
@@ -180,6 +221,51 @@ Accepted values: "acr", "adx ..", or "All" to delete configuration for all resou
         "--username", required=True, help="Username of the user to delete"
     )
 
+    parser_user = subparsers.add_parser("user", help="Operations related to users")
+    user_operations = parser_user.add_subparsers(
+        dest="operation",
+        title="Available operations",
+        metavar="operation",
+        help="Description of the operation to perform",
+    )
+
+    # 'import' subcommand under 'user'
+    parser_userimport = user_operations.add_parser(
+        "import", help="Provision the users of a CSV or YAML roster"
+    )
+    parser_userimport.add_argument(
+        "--roster",
+        required=True,
+        help="CSV file or YAML list of users with username, email, team and policies",
+    )
+    parser_userimport.add_argument(
+        "--parallel",
+        type=int,
+        default=8,
+        help="Number of users provisioned concurrently, default: 8",
+    )
+
+    # 'list' and 'find' subcommands under 'user'
+    parser_userlist = user_operations.add_parser(
+        "list", help="List the users of the organization from the local user index"
+    )
+    parser_userfind = user_operations.add_parser(
+        "find", help="Search the users of the organization in the local user index"
+    )
+    parser_userfind.add_argument("--team", help="Only show the users of this team")
+    parser_userfind.add_argument("--email", help="Only show the user with this email")
+    for index_parser in [parser_userlist, parser_userfind]:
+        index_parser.add_argument(
+            "--refresh",
+            action="store_true",
+            help="Read the entities added, removed, renamed or with changed aliases since the index was built",
+        )
+        index_parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild the user index from every entity, also picks up metadata edited outside this tool",
+        )
+
     parser_secrets = subparsers.add_parser(
         "secrets", help="Operations related to secrets management"
     )
@@ -197,6 +283,15 @@ Accepted values: "acr", "adx ..", or "All" to delete configuration for all resou
         required=True,
         help="Path to the Json file containing secrets platform",
     )
+    parser_addsecrets.add_argument(
+        "--mapping-file",
+        help="Path to a YAML file mapping terraform outputs to Vault secrets (optional)",
+    )
+    parser_addsecrets.add_argument(
+        "--no-state-cache",
+        action="store_true",
+        help="Always download the terraform state instead of using the local cache",
+    )
     secret_subparsers.add_parser("delete", help="Delete an existing secret")
 
     # Add the 'policies' subcommand parser
@@ -236,6 +331,19 @@ Accepted values: "acr", "adx ..", or "All" to delete configuration for all resou
         required=True,
         help="Path to the YAML file containing update policy definitions",
     )
+    for policies_parser in [parser_addpolicies, parser_updatepolicies]:
+        policies_parser.add_argument(
+            "--parallel",
+            type=int,
+            default=8,
+            help="Number of concurrent policy reads and writes, default: 8",
+        )
+        policies_parser.add_argument(
+            "--orgs",
+            type=parse_orgs,
+            help="Comma-separated org:tenant pairs to render the policy templates for, "
+            "default: ORGANIZATION_NAME:TENANT_ID",
+        )
 
     # Add the 'data' subcommand parser
     parser_data = subparsers.add_parser(
@@ -263,7 +371,99 @@ Accepted values: "acr", "adx ..", or "All" to delete configuration for all resou
         choices=["v1", "v2"],
     )
     parser_backup.add_argument(
-        "--platform-id", required=True, help="Platform ID containing all secrets"
+        "--platform-id",
+        required=True,
+        help="Platform ID containing all secrets, or a comma-separated list of platform IDs",
+    )
+    parser_backup.add_argument(
+        "--archive",
+        help="Save the platforms into this compressed backup archive instead of JSON files",
+    )
+    parser_backup.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only back up the secrets whose KV v2 version changed since the last backup",
+    )
+    parser_backup.add_argument(
+        "--parallel",
+        type=int,
+        default=8,
+        help="Number of concurrent Vault reads, default: 8",
+    )
+
+    # 'import' subcommand under 'data'
+    parser_import = data_subparsers.add_parser(
+        name="import",
+        help="restore config data from a backup file or archive",
+    )
+    parser_import.add_argument(
+        "--platform-id",
+        required=True,
+        help="Platform ID to restore the config to, a comma-separated list, or 'all' for every platform of an archive",
+    )
+    parser_import.add_argument(
+        "--backup-file",
+        required=True,
+        help="Path to the backup JSON file or compressed backup archive",
+    )
+    parser_import.add_argument(
+        "--source-platform",
+        help="Platform ID to read from the backup archive, default: --platform-id",
+    )
+    parser_import.add_argument(
+        "--parallel",
+        type=int,
+        default=4,
+        help="Number of concurrent Vault writes, default: 4",
+    )
+    parser_import.add_argument(
+        "--rate",
+        type=float,
+        help="Maximum number of Vault writes per second (optional)",
+    )
+    parser_import.add_argument(
+        "--plan",
+        action="store_true",
+        help="Only show which paths and fields would change, without writing",
+    )
+    parser_import.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="Maximum number of concurrent Vault reads with --plan, default: 16",
+    )
+    parser_import.add_argument(
+        "--delta",
+        action="append",
+        dest="deltas",
+        help="Incremental backup to apply on top of --backup-file, can be repeated (oldest first)",
+    )
+    parser_import.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the checkpoint of a previous interrupted restore",
+    )
+
+    # 'export' subcommand under 'data'
+    parser_export = data_subparsers.add_parser(
+        name="export",
+        help="export every secret of the tenant to a JSON lines file",
+    )
+    parser_export.add_argument(
+        "--engine",
+        help="Specify the version of engine, default: v2",
+        choices=["v1", "v2"],
+    )
+    parser_export.add_argument(
+        "--output",
+        default="export.jsonl",
+        help="Path of the JSON lines file to write, default: export.jsonl",
+    )
+    parser_export.add_argument(
+        "--parallel",
+        type=int,
+        default=16,
+        help="Number of concurrent Vault requests, default: 16",
     )
 
     # Parse the arguments
@@ -272,7 +472,6 @@ Accepted values: "acr", "adx ..", or "All" to delete configuration for all resou
     disable = DisableTenant()
     useradd = UserAdd()
     userdelete = UserDelete()
-    secretsadd = AddSecrets()
     secretsdelete = DeletesSecrets()
     addpolicies = AddPolicies()
     deletepolicies = DeletePolicies()
@@ -281,21 +480,44 @@ Accepted values: "acr", "adx ..", or "All" to delete configuration for all resou
     # Handling the commands
     if args.command == "config":
         if args.operation == "write":
+            platform_ids = []
+            if args.platform_id:
+                platform_ids += [p.strip() for p in args.platform_id.split(",") if p.strip()]
+            if args.platforms_file:
+                platform_ids += read_platform_manifest(args.platforms_file)
+            if not platform_ids:
+                print("Error: --platform-id or --platforms-file is required.")
+                parser_write.print_help()
+                return
             try:
                 write = WriteConfig(
                     version_engine=args.engine,
                     local_file=args.file,
                     use_azure=args.use_azure,
                     from_tfstate=args.from_tfstate,
+                    use_state_cache=not args.no_state_cache,
+                    skip_unchanged=args.skip_unchanged,
+                    mapping_file=args.mapping_file,
                 )
                 print("Writing configuration for all resources.")
-                if args.resource == "all":
-                    write.write_all_config(platform_id=args.platform_id)
+                if len(platform_ids) > 1 or args.skip_unchanged:
+                    write.write_platforms(
+                        platform_ids=platform_ids,
+                        resource=args.resource,
+                        parallel=args.parallel,
+                    )
+                elif args.resource == "all":
+                    write.write_all_config(
+                        platform_id=platform_ids[0], parallel=args.parallel
+                    )
                 else:
                     write.write_config(
-                        resource=args.resource, platform_id=args.platform_id
+                        resource=args.resource, platform_id=platform_ids[0]
                     )
-                print("Configuration written successfully.")
+                if write.report and write.report["failed"]:
+                    print("Configuration written with errors.")
+                else:
+                    print("Configuration written successfully.")
             except Exception as e:
                 print(f"An error occurred while writing the configuration: {str(e)}")
         elif args.operation == "read":
@@ -313,10 +535,13 @@ Accepted values: "acr", "adx ..", or "All" to delete configuration for all resou
                         local_file=args.file,
                         use_azure=args.use_azure,
                         version_engine=args.engine,
+                        use_state_cache=not args.no_state_cache,
                     )
                     if args.resource == "all":
                         logger.info("Reading configuration for all resources.")
-                        config = read.read_all_config()
+                        config = read.read_all_config(
+                            concurrency=args.concurrency
+                        )
                     else:
                         logger.info(
                             f"Reading configuration for resource: {args.resource}"
@@ -385,12 +610,30 @@ Accepted values: "acr", "adx ..", or "All" to delete configuration for all resou
                     "Error: Missing required argument '--username' for deleting a user."
                 )
                 # parser_userdelete.print_help()
-        # else:
-        # parser_user.print_help()
+        elif args.operation == "import":
+            print(f"Importing users from {args.roster}.")
+            UserImport().import_users(args.roster, parallel=args.parallel)
+        elif args.operation in ["list", "find"]:
+            index = UserIndex()
+            index.print_users(
+                index.find(
+                    team=getattr(args, "team", None),
+                    email=getattr(args, "email", None),
+                    refresh=args.refresh,
+                    full=args.full,
+                )
+            )
+        else:
+            parser_user.print_help()
     elif args.command == "secrets":
         if args.operation == "add":
             if args.secrets_path:
                 print("Adding Platform secrets.")
+                # Built here only, it downloads the tfstate on creation
+                secretsadd = AddSecrets(
+                    use_state_cache=not args.no_state_cache,
+                    mapping_file=args.mapping_file,
+                )
                 secretsadd.add_patform_secrets(args.secrets_path)
             else:
                 print("Error: --secrets_path argument is required for adding secrets.")
@@ -407,7 +650,11 @@ Accepted values: "acr", "adx ..", or "All" to delete configuration for all resou
                 parser_addpolicies.print_help()
             else:
                 print(f"Adding policies from file: {args.policy_file}.")
-                addpolicies.add_policies_from_file(args.policy_file)
+                addpolicies.add_policies_from_file(
+                    args.policy_file,
+                    parallel=args.parallel,
+                    orgs=args.orgs,
+                )
         elif args.operation == "delete":
             if not args.policy_name:
                 print(
@@ -425,14 +672,69 @@ Accepted values: "acr", "adx ..", or "All" to delete configuration for all resou
                 parser_deletepolicies.print_help()
             else:
                 print(f"Updating policy: {args.policy_file}.")
-                updatepolicies.update_policies_from_file(args.policy_file)
+                updatepolicies.update_policies_from_file(
+                    args.policy_file,
+                    parallel=args.parallel,
+                    orgs=args.orgs,
+                )
         else:
             parser_policies.print_help()
     elif args.command == "data":
-        backup = Backup(version_engine=args.engine)
         if args.operation == "backup":
+            if args.archive and args.incremental:
+                print("Error: --incremental cannot be used with --archive, archives always hold full backups.")
+                return
+            backup = Backup(version_engine=args.engine)
             print("Backing up data config.")
-            backup.backup_config(platform_id=args.platform_id)
+            platform_ids = [p.strip() for p in args.platform_id.split(",") if p.strip()]
+            if args.archive:
+                backup.backup_to_archive(
+                    platform_ids=platform_ids,
+                    archive_file=args.archive,
+                    parallel=args.parallel,
+                )
+            else:
+                for platform_id in platform_ids:
+                    backup.backup_config(
+                        platform_id=platform_id,
+                        parallel=args.parallel,
+                        incremental=args.incremental,
+                    )
+        elif args.operation == "import":
+            if args.platform_id == "all":
+                if not is_archive(args.backup_file):
+                    print(f"Error: --platform-id all needs a backup archive, {args.backup_file} is not one.")
+                    return
+                platform_ids = BackupArchive(args.backup_file).platforms()
+            else:
+                platform_ids = [p.strip() for p in args.platform_id.split(",") if p.strip()]
+            restore = ImportConfig()
+            if args.plan:
+                restore.plan_import(
+                    platform_ids=platform_ids,
+                    backup_file=args.backup_file,
+                    source_platform=args.source_platform,
+                    concurrency=args.concurrency,
+                    deltas=args.deltas,
+                )
+            else:
+                print("Restoring data config.")
+                for platform_id in platform_ids:
+                    restore.import_config(
+                        platform_id_to=platform_id,
+                        backup_file=args.backup_file,
+                        source_platform=args.source_platform,
+                        parallel=args.parallel,
+                        rate=args.rate,
+                        restart=args.restart,
+                        deltas=args.deltas,
+                    )
+        elif args.operation == "export":
+            print(f"Exporting tenant secrets to {args.output}.")
+            Backup(version_engine=args.engine).export_tenant(
+                output_file=args.output,
+                parallel=args.parallel,
+            )
         else:
             parser_data.print_help()
     else:
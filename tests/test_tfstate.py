@@ -0,0 +1,11 @@
+from vault.common.tfstate import load_state_outputs
+
+
+def test_multibyte_character_split_after_outputs():
+    chunks = [b'{"outputs":{"a":1},"r":"\xc3', b'\xa9"}']
+    assert load_state_outputs(chunks) == {"outputs": {"a": 1}}
+
+
+def test_multibyte_character_split_inside_outputs():
+    chunks = [b'{"outputs":{"a":{"value":"\xc3', b'\xa9"}},"r":1}']
+    assert load_state_outputs(chunks) == {"outputs": {"a": {"value": "é"}}}
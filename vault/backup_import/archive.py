@@ -0,0 +1,83 @@
+import os
+import json
+import zipfile
+import logging
+import tempfile
+
+logger = logging.getLogger("Babylon")
+
+
+def is_archive(file_path: str):
+    return os.path.isfile(file_path) and zipfile.is_zipfile(file_path)
+
+
+class BackupArchive:
+    """
+    Compressed backup archive holding the config of many platforms.
+
+    The archive is a zip file with one deflated member per resource, named
+    <platform_id>/<resource>.json and holding the raw secret payload. The
+    zip central directory is the index: it maps each member to its offset,
+    so a single platform or resource is restored without decompressing the
+    rest of the archive.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    @staticmethod
+    def _member(platform_id: str, resource: str):
+        return f"{platform_id}/{resource}.json"
+
+    def _names(self):
+        if not os.path.exists(self.file_path):
+            return []
+        with zipfile.ZipFile(self.file_path, "r") as archive:
+            return archive.namelist()
+
+    def platforms(self):
+        return sorted({name.split("/", 1)[0] for name in self._names()})
+
+    def resources(self, platform_id: str):
+        prefix = f"{platform_id}/"
+        return [
+            name[len(prefix):-len(".json")]
+            for name in self._names()
+            if name.startswith(prefix) and name.endswith(".json")
+        ]
+
+    def read_resource(self, platform_id: str, resource: str):
+        with zipfile.ZipFile(self.file_path, "r") as archive:
+            return json.loads(archive.read(self._member(platform_id, resource)))
+
+    def read_platform(self, platform_id: str):
+        prefix = f"{platform_id}/"
+        config = dict()
+        with zipfile.ZipFile(self.file_path, "r") as archive:
+            for name in archive.namelist():
+                if name.startswith(prefix) and name.endswith(".json"):
+                    config[name[len(prefix):-len(".json")]] = json.loads(archive.read(name))
+        return config
+
+    def _drop_platform(self, platform_id: str):
+        # zip members cannot be replaced in place, copy the others to a new archive
+        prefix = f"{platform_id}/"
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.close(fd)
+        with zipfile.ZipFile(self.file_path, "r") as source, zipfile.ZipFile(
+            tmp, "w", compression=zipfile.ZIP_DEFLATED
+        ) as target:
+            for item in source.infolist():
+                if not item.filename.startswith(prefix):
+                    target.writestr(item, source.read(item.filename))
+        os.replace(tmp, self.file_path)
+
+    def write_platform(self, platform_id: str, config: dict):
+        if platform_id in self.platforms():
+            self._drop_platform(platform_id)
+        with zipfile.ZipFile(self.file_path, "a", compression=zipfile.ZIP_DEFLATED) as archive:
+            for resource, data in config.items():
+                archive.writestr(self._member(platform_id, resource), json.dumps(data))
+        logger.info(f"Platform {platform_id} saved to {self.file_path} ({len(config)} resources)")
+        return self
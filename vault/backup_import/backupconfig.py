@@ -2,7 +2,14 @@ import logging
 import sys
 import os
 import json
+import datetime
+import tempfile
 import hvac
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from vault.common.vault_client import get_vault_client
+from vault.config.mapping import load_mapping_section, resource_paths
+from vault.backup_import.archive import BackupArchive
 
 logger = logging.getLogger("Babylon")
 
@@ -38,58 +45,209 @@ class Backup:
 
         self.org_tenant = f"{self.tenant_id}"
         self.prefix = f"{self.org_tenant}/babylon/config"
+        self.mapping = load_mapping_section("config")
 
-    def backup_config(self, platform_id: str):
-        client = hvac.Client(url=self.server_id, token=self.token)
-        self.platform_prefix = f"{self.org_tenant}/platform/{platform_id}"
-        self.babylon_prefix = f"{self.org_tenant}/babylon/{platform_id}"
-
-        # Define the paths for KV version 2
-        paths = {
-            "acr": f"{self.prefix}/{platform_id}/acr",
-            "adt": f"{self.prefix}/{platform_id}/adt",
-            "adx": f"{self.prefix}/{platform_id}/adx",
-            "api": f"{self.prefix}/{platform_id}/api",
-            "app": f"{self.prefix}/{platform_id}/app",
-            "azure": f"{self.prefix}/{platform_id}/azure",
-            "babylon": f"{self.prefix}/{platform_id}/babylon",
-            "github": f"{self.prefix}/{platform_id}/github",
-            "platform": f"{self.prefix}/{platform_id}/platform",
-            "powerbi": f"{self.prefix}/{platform_id}/powerbi",
-            "webapp": f"{self.prefix}/{platform_id}/webapp",
-            "client": f"{self.babylon_prefix}/client",
-            "storage": f"{self.platform_prefix}/storage/account"
+    def platform_paths(self, platform_id: str):
+        return resource_paths(self.mapping, tenant_id=self.tenant_id, platform_id=platform_id)
+
+    def _read_path(self, client, schema: str):
+        try:
+            if self.version_engine == "v1":
+                response = client.read(path=f"{self.org_name}/{schema}")
+                return dict(data=(response or {}).get("data", {}))
+            response = client.secrets.kv.v2.read_secret_version(
+                path=schema,
+                mount_point=self.org_name,
+            )
+            metadata = response.get("data", {}).get("metadata", {})
+            return dict(
+                data=response.get("data", {}).get("data", {}),
+                version=metadata.get("version"),
+                updated_time=metadata.get("created_time"),
+            )
+        except Exception as e:
+            logger.warning(f"Failed to read secret from path '{schema}': {e}")
+            return None
+
+    def _read_metadata(self, client, schema: str):
+        try:
+            response = client.secrets.kv.v2.read_secret_metadata(
+                path=schema,
+                mount_point=self.org_name,
+            )
+            metadata = response.get("data", {})
+            return dict(
+                version=metadata.get("current_version"),
+                updated_time=metadata.get("updated_time"),
+            )
+        except hvac.exceptions.InvalidPath:
+            return dict(version=None, updated_time=None)
+        except Exception as e:
+            logger.warning(f"Failed to read metadata from path '{schema}': {e}")
+            return None
+
+    def _to_outputs(self, schema: str, data: dict):
+        resource = schema.split("/")[-1]
+        output = dict(outputs=dict())
+        for i, k in data.items():
+            output["outputs"].setdefault(f"out_{resource}_{i}", dict(value=k))
+        return output
+
+    def _write_backup(self, client, output_file: str, paths: dict, parallel: int, deleted: list = None):
+        manifest = dict()
+        # Resources are streamed to a temporary file as soon as they are read,
+        # the previous backup is only replaced once the new one is complete
+        directory = os.path.dirname(os.path.abspath(output_file))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            self._stream_backup(client, fd, paths, parallel, deleted, manifest)
+            os.replace(tmp, output_file)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        logger.info(f"Configuration backed up to {output_file} ({len(manifest)}/{len(paths)} resources)")
+        return manifest
+
+    def _stream_backup(self, client, fd: int, paths: dict, parallel: int, deleted: list, manifest: dict):
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor, os.fdopen(fd, "w") as f:
+            futures = {executor.submit(self._read_path, client, schema): k_ for k_, schema in paths.items()}
+            f.write('{\n  "outputs": {')
+            for future in as_completed(futures):
+                k_ = futures[future]
+                result = future.result()
+                if result is None:
+                    continue
+                output = self._to_outputs(paths[k_], result["data"])
+                f.write(f"{',' if manifest else ''}\n    {json.dumps(k_)}: {json.dumps(output)}")
+                manifest[k_] = dict(
+                    path=paths[k_],
+                    version=result.get("version"),
+                    updated_time=result.get("updated_time"),
+                )
+            f.write("\n  }")
+            if deleted is not None:
+                f.write(f',\n  "deleted": {json.dumps(deleted)}')
+            f.write("\n}\n")
+
+    def _read_manifest(self, manifest_file: str):
+        if not os.path.exists(manifest_file):
+            return None
+        with open(manifest_file, "r") as f:
+            return json.load(f).get("paths", {})
+
+    def _write_manifest(self, manifest_file: str, manifest: dict):
+        with open(manifest_file, "w") as f:
+            json.dump(dict(paths=manifest), f, indent=2)
+
+    def backup_config(self, platform_id: str, parallel: int = 8, incremental: bool = False):
+        client = get_vault_client(self.server_id, self.token)
+        paths = self.platform_paths(platform_id)
+        manifest_file = f"backup.{platform_id}.manifest.json"
+        if incremental and self.version_engine == "v1":
+            logger.warning("Incremental backups need the KV v2 engine, doing a full backup")
+            incremental = False
+        manifest = self._read_manifest(manifest_file) if incremental else None
+        if manifest is None:
+            manifest = self._write_backup(client, f"backup.{platform_id}.json", paths, parallel)
+            if self.version_engine != "v1":
+                self._write_manifest(manifest_file, manifest)
+            return
+
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+            metadata = dict(zip(paths, executor.map(lambda p: self._read_metadata(client, p), paths.values())))
+        # Paths whose metadata could not be read are fetched again to be safe
+        changed = {
+            k_: schema
+            for k_, schema in paths.items()
+            if metadata[k_] is None
+            or (
+                metadata[k_]["version"] is not None
+                and metadata[k_]["version"] != manifest.get(k_, {}).get("version")
+            )
         }
+        deleted = [
+            k_ for k_ in manifest
+            if k_ not in metadata or (metadata[k_] is not None and metadata[k_]["version"] is None)
+        ]
+        timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output_file = f"backup.{platform_id}.{timestamp}.delta.json"
+        manifest.update(self._write_backup(client, output_file, changed, parallel, deleted=deleted))
+        for k_ in deleted:
+            del manifest[k_]
+        self._write_manifest(manifest_file, manifest)
+        logger.info(f"{len(changed)} changed and {len(deleted)} deleted out of {len(paths)} resources")
+
+    def backup_to_archive(self, platform_ids: list, archive_file: str, parallel: int = 8):
+        client = get_vault_client(self.server_id, self.token)
+        archive = BackupArchive(archive_file)
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+            futures = {
+                platform_id: {
+                    k_: executor.submit(self._read_path, client, schema)
+                    for k_, schema in self.platform_paths(platform_id).items()
+                }
+                for platform_id in platform_ids
+            }
+            for platform_id, platform_futures in futures.items():
+                config = dict()
+                for k_, future in platform_futures.items():
+                    result = future.result()
+                    if result is not None:
+                        config[k_] = result["data"]
+                archive.write_platform(platform_id, config)
+        logger.info(f"Configuration of {len(platform_ids)} platform(s) backed up to {archive_file}")
+
+    def _list_path(self, client, schema: str):
+        try:
+            if self.version_engine == "v1":
+                response = client.list(f"{self.org_name}/{schema}")
+            else:
+                response = client.secrets.kv.v2.list_secrets(
+                    path=schema,
+                    mount_point=self.org_name,
+                )
+            return (response or {}).get("data", {}).get("keys", [])
+        except hvac.exceptions.InvalidPath:
+            return []
+        except Exception as e:
+            logger.warning(f"Failed to list secrets under '{schema}': {e}")
+            return []
+
+    def export_tenant(self, output_file: str, parallel: int = 16):
+        """
+        Exports every secret under the tenant to a JSON lines file.
 
-        config = {}
-
-        # Read each path using KV version 2
-        for k_, schema in paths.items():
-            try:
-                resource = schema.split("/")[-1]
-                if self.version_engine == "v1":
-                    response = client.read(path=f"{self.org_name}/{schema}")
-                    data = response.get('data', {})
-                    output = dict(outputs=dict())
-                    for i, k in data.items():
-                        output["outputs"].setdefault(f"out_{resource}_{i}", dict(value=k))
-                else:
-                    response = client.secrets.kv.v2.read_secret_version(
-                        path=schema,
-                        mount_point=self.org_name,
-                    )
-                    # config[key] = response.get('data', {}).get('data', {})
-            except Exception as e:
-                logger.warning(f"Failed to read secret from path '{schema}': {e}")
-                # config[key] = {}
-
-            config[k_] = output
-
-        config = {"outputs": config}
-        output_file = f"backup.{platform_id}.json"
-        with open(output_file, 'w') as f:
-            json.dump(config, f, indent=2)
-        logger.info(f"Configuration backed up to {output_file}")
+        The KV tree is walked breadth-first with LIST calls. Folders and
+        leaves share one pool and at most `parallel` requests are in flight,
+        so the walk runs at Vault throughput. Each leaf is written as soon as
+        it is read, one {"path", "data", "version", "updated_time"} per line.
+        """
+        client = get_vault_client(self.server_id, self.token)
+        frontier = deque([f"{self.tenant_id}/"])
+        exported = failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor, open(output_file, "w") as f:
+            running = dict()
+            while frontier or running:
+                while frontier and len(running) < max(1, parallel):
+                    schema = frontier.popleft()
+                    if schema.endswith("/"):
+                        running[executor.submit(self._list_path, client, schema.rstrip("/"))] = schema
+                    else:
+                        running[executor.submit(self._read_path, client, schema)] = schema
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    schema = running.pop(future)
+                    result = future.result()
+                    if schema.endswith("/"):
+                        frontier.extend(f"{schema}{key}" for key in result)
+                        continue
+                    if result is None:
+                        failed += 1
+                        continue
+                    f.write(json.dumps(dict(path=schema, **result)) + "\n")
+                    exported += 1
+        logger.info(f"Tenant {self.tenant_id} exported to {output_file} ({exported} secrets, {failed} failed)")
+        return dict(exported=exported, failed=failed)
 
     # def save_backup_to_blob(self):
     #     _file = pathlib.Path(f"backup-{self.platform_name}.json")
@@ -2,9 +2,12 @@ import logging
 import sys
 import os
 import json
-import pathlib
-import hvac
-from azure.storage.blob import BlobServiceClient
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from vault.common.vault_client import get_vault_client
+from vault.common.rate_limit import RateLimiter
+from vault.common.async_vault import read_secrets
+from vault.config.mapping import load_mapping_section, resource_path
+from vault.backup_import.archive import BackupArchive, is_archive
 
 logger = logging.getLogger("Babylon")
 
@@ -19,10 +22,6 @@ class ImportConfig:
                 "TENANT_ID",
                 "CLUSTER_NAME",
                 "PLATFORM_NAME",
-                "STORAGE_ACCOUNT_NAME",
-                "STORAGE_ACCOUNT_KEY",
-                "STORAGE_CONTAINER",
-                "TFSTATE_BLOB_NAME",
         ]:
             if v not in os.environ:
                 logger.error(f" {v} is missing")
@@ -34,128 +33,178 @@ class ImportConfig:
         self.tenant_id = os.environ.get("TENANT_ID")
         self.cluster_name = os.environ.get("CLUSTER_NAME")
         self.platform_name = os.environ.get("PLATFORM_NAME")
-        self.storage_name = os.environ.get("STORAGE_ACCOUNT_NAME")
-        self.storage_secret = os.environ.get("STORAGE_ACCOUNT_KEY")
-        self.storage_container = os.environ.get("STORAGE_CONTAINER")
-        self.tfstate_blob_name = os.environ.get("TFSTATE_BLOB_NAME")
 
         tenant = f"{self.tenant_id}"
         self.prefix = f"{tenant}/babylon/config"
-        self.data = None
-        self.state = None
-        _file = pathlib.Path(f"backup-{self.platform_name}.json")
-        if _file.exists():
-            with open(_file) as f:
-                self.data = json.loads(f.read())
-        else:
-            self.dowload_ftstate()
-            self.data = json.loads(self.state)
-
-        if self.data is None:
-            logger.error("data is missing")
-            sys.exit(1)
-
-    def dowload_ftstate(self):
-        prefix = "DefaultEndpointsProtocol=https;"
-        prefix += f"AccountName={self.storage_name}"
-        conn_str = f"{prefix};AccountKey={self.storage_secret};"
-        conn_str += "EndpointSuffix=core.windows.net"
-        self.blob_client = BlobServiceClient.from_connection_string(conn_str)
-        try:
-            service = self.blob_client.get_container_client(container=self.storage_container)
-            blob = service.get_blob_client(blob=self.tfstate_blob_name)
-            state = blob.download_blob(encoding="utf-8").content_as_bytes()
-            self.state = state
-        except Exception:
-            self.state = "{}"
-            logger.info("blob not found")
-
-    def import_config(self, platform_id_to, backup_file):
-        client = hvac.Client(url=self.server_id, token=self.token)
-        acr_path = f"{self.prefix}/{platform_id_to}/acr"
-        adt_path = f"{self.prefix}/{platform_id_to}/adt"
-        adx_path = f"{self.prefix}/{platform_id_to}/adx"
-        api_path = f"{self.prefix}/{platform_id_to}/api"
-        app_path = f"{self.prefix}/{platform_id_to}/app"
-        azure_path = f"{self.prefix}/{platform_id_to}/azure"
-        babylon_path = f"{self.prefix}/{platform_id_to}/babylon"
-        github_path = f"{self.prefix}/{platform_id_to}/github"
-        platform_path = f"{self.prefix}/{platform_id_to}/platform"
-        powerbi_path = f"{self.prefix}/{platform_id_to}/powerbi"
-        webapp_path = f"{self.prefix}/{platform_id_to}/webapp"
-
-        if not os.path.exists(backup_file):
-            print(f"Backup file {backup_file} does not exist.")
-        else:
-            with open(backup_file, 'r') as f:
-                config = json.load(f)
-
-            # Use the version 2 secrets engine API
-            if 'acr' in config:
-                client.secrets.kv.v2.create_or_update_secret(
-                    path=acr_path,
-                    secret=config['acr'],
-                    mount_point=self.org_name,
-                )
-            if 'adt' in config:
-                client.secrets.kv.v2.create_or_update_secret(
-                    path=adt_path,
-                    secret=config['adt'],
-                    mount_point=self.org_name,
-                )
-            if 'adx' in config:
-                client.secrets.kv.v2.create_or_update_secret(
-                    path=adx_path,
-                    secret=config['adx'],
-                    mount_point=self.org_name,
-                )
-            if 'api' in config:
-                client.secrets.kv.v2.create_or_update_secret(
-                    path=api_path,
-                    secret=config['api'],
-                    mount_point=self.org_name,
-                )
-            if 'app' in config:
-                client.secrets.kv.v2.create_or_update_secret(
-                    path=app_path,
-                    secret=config['app'],
-                    mount_point=self.org_name,
-                )
-            if 'azure' in config:
-                client.secrets.kv.v2.create_or_update_secret(
-                    path=azure_path,
-                    secret=config['azure'],
-                    mount_point=self.org_name,
-                )
-            if 'babylon' in config:
-                client.secrets.kv.v2.create_or_update_secret(
-                    path=babylon_path,
-                    secret=config['babylon'],
-                    mount_point=self.org_name,
-                )
-            if 'github' in config:
-                client.secrets.kv.v2.create_or_update_secret(
-                    path=github_path,
-                    secret=config['github'],
-                    mount_point=self.org_name,
-                )
-            if 'platform' in config:
-                client.secrets.kv.v2.create_or_update_secret(
-                    path=platform_path,
-                    secret=config['platform'],
-                    mount_point=self.org_name,
-                )
-            if 'powerbi' in config:
-                client.secrets.kv.v2.create_or_update_secret(
-                    path=powerbi_path,
-                    secret=config['powerbi'],
-                    mount_point=self.org_name,
-                )
-            if 'webapp' in config:
-                client.secrets.kv.v2.create_or_update_secret(
-                    path=webapp_path,
-                    secret=config['webapp'],
-                    mount_point=self.org_name,
-                )
+        self.mapping = load_mapping_section("config")
+
+    def _from_backup_outputs(self, outputs: dict):
+        # backup.<platform-id>.json stores out_<resource>_<field> entries
+        config = dict()
+        for resource, output in outputs.items():
+            path = self.mapping.get(resource, {}).get("path", resource)
+            prefix = f"out_{path.split('/')[-1]}_"
+            config[resource] = {
+                (k[len(prefix):] if k.startswith(prefix) else k): v.get("value")
+                for k, v in output.get("outputs", {}).items()
+            }
+        return config
+
+    def _read_backup_file(self, backup_file: str, platform_id: str):
+        if is_archive(backup_file):
+            return BackupArchive(backup_file).read_platform(platform_id), []
+        with open(backup_file, 'r') as f:
+            config = json.load(f)
+        deleted = config.get("deleted", []) if isinstance(config.get("deleted"), list) else []
+        if isinstance(config.get("outputs"), dict):
+            config = self._from_backup_outputs(config["outputs"])
+        return config, deleted
+
+    def load_backup(self, backup_file: str, platform_id: str, deltas: list = None):
+        """
+        Returns resource -> secret from a full backup, with the incremental
+        backups in deltas layered on top in order: their resources replace
+        the previous ones and their "deleted" resources are dropped.
+        """
+        config, _ = self._read_backup_file(backup_file, platform_id)
+        for delta_file in deltas or []:
+            changes, deleted = self._read_backup_file(delta_file, platform_id)
+            config.update(changes)
+            for resource in deleted:
+                config.pop(resource, None)
+        return config
+
+    def _missing_files(self, backup_file: str, deltas: list = None):
+        missing = [f for f in [backup_file] + list(deltas or []) if not os.path.exists(f)]
+        for f in missing:
+            print(f"Backup file {f} does not exist.")
+        return missing
+
+    def target_path(self, resource: str, platform_id: str):
+        if resource in self.mapping:
+            return resource_path(
+                self.mapping[resource],
+                tenant_id=self.tenant_id,
+                platform_id=platform_id,
+                cluster_name=self.cluster_name,
+                platform_name=self.platform_name,
+            )
+        return f"{self.prefix}/{platform_id}/{resource}"
 
+    def plan_import(
+        self,
+        platform_ids: list,
+        backup_file,
+        source_platform=None,
+        concurrency: int = 16,
+        deltas: list = None,
+    ):
+        if self._missing_files(backup_file, deltas):
+            return None
+        targets = dict()
+        for platform_id in platform_ids:
+            config = self.load_backup(backup_file, source_platform or platform_id, deltas)
+            for resource, secret in config.items():
+                targets[self.target_path(resource, platform_id)] = secret
+        responses = read_secrets(
+            url=self.server_id,
+            token=self.token,
+            paths=list(targets),
+            version_engine="v2",
+            mount_point=self.org_name,
+            concurrency=concurrency,
+            missing_ok=True,
+        )
+        plan = {"added": [], "changed": [], "unchanged": []}
+        # Only field names are printed, secret values never leave Vault
+        for path in sorted(targets):
+            desired = targets[path]
+            current = ((responses.get(path) or {}).get("data") or {}).get("data")
+            if current is None:
+                plan["added"].append(path)
+                print(f"+ {path}")
+                for field in sorted(desired):
+                    print(f"    + {field}")
+                continue
+            details = [f"    + {field}" for field in sorted(set(desired) - set(current))]
+            details += [f"    - {field}" for field in sorted(set(current) - set(desired))]
+            details += [
+                f"    ~ {field}"
+                for field in sorted(set(desired) & set(current))
+                if desired[field] != current[field]
+            ]
+            if not details:
+                plan["unchanged"].append(path)
+                continue
+            plan["changed"].append(path)
+            print(f"~ {path}")
+            for line in sorted(details, key=lambda d: d[6:]):
+                print(line)
+        print(
+            f"Plan: {len(plan['added'])} to add, {len(plan['changed'])} to change, "
+            f"{len(plan['unchanged'])} unchanged"
+        )
+        return plan
+
+    def _read_checkpoint(self, checkpoint_file: str):
+        if not os.path.exists(checkpoint_file):
+            return set()
+        with open(checkpoint_file, 'r') as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def _restore_path(self, client, limiter, path: str, secret: dict):
+        limiter.acquire()
+        client.secrets.kv.v2.create_or_update_secret(
+            path=path,
+            secret=secret,
+            mount_point=self.org_name,
+        )
+        return path
+
+    def import_config(
+        self,
+        platform_id_to,
+        backup_file,
+        source_platform=None,
+        parallel: int = 4,
+        rate: float = None,
+        restart: bool = False,
+        deltas: list = None,
+    ):
+        if self._missing_files(backup_file, deltas):
+            return
+        client = get_vault_client(self.server_id, self.token)
+        config = self.load_backup(backup_file, source_platform or platform_id_to, deltas)
+        checkpoint_file = f"{backup_file}.{platform_id_to}.checkpoint"
+        if restart and os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
+        done = self._read_checkpoint(checkpoint_file)
+        paths = {self.target_path(resource, platform_id_to): secret for resource, secret in config.items()}
+        todo = {path: secret for path, secret in paths.items() if path not in done}
+        if done:
+            print(f"Resuming restore: {len(paths) - len(todo)} of {len(paths)} paths already restored")
+
+        limiter = RateLimiter(rate)
+        failed = dict()
+        # Each restored path is appended to the checkpoint as soon as it is written
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor, open(checkpoint_file, 'a') as checkpoint:
+            futures = {
+                executor.submit(self._restore_path, client, limiter, path, secret): path
+                for path, secret in todo.items()
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    future.result()
+                    checkpoint.write(f"{path}\n")
+                    checkpoint.flush()
+                except Exception as e:
+                    failed[path] = str(e)
+                    logger.error(f"Failed to restore {path}: {e}")
+
+        print(f"Summary: {len(todo) - len(failed)} restored, {len(paths) - len(todo)} skipped, {len(failed)} failed")
+        if failed:
+            print(f"Run the same command again to resume from {checkpoint_file}")
+        else:
+            os.remove(checkpoint_file)
             print(f"Configuration restored from {backup_file}")
@@ -0,0 +1,95 @@
+import os
+import ssl
+import asyncio
+import logging
+import aiohttp
+from vault.common.vault_client import pool_settings, tls_settings
+
+logger = logging.getLogger("Babylon")
+
+
+def _secret_url(url: str, path: str, version_engine: str, mount_point: str):
+    if version_engine == "v1":
+        return f"{url.rstrip('/')}/v1/{path}"
+    return f"{url.rstrip('/')}/v1/{mount_point}/data/{path}"
+
+
+def _ssl_context():
+    # Same CA and client certificate as the hvac client
+    verify, cert = tls_settings()
+    if verify is True:
+        context = ssl.create_default_context()
+    elif os.path.isdir(verify):
+        context = ssl.create_default_context(capath=verify)
+    else:
+        context = ssl.create_default_context(cafile=verify)
+    if cert is not None:
+        context.load_cert_chain(*cert)
+    return context
+
+
+async def _read_secret(session, semaphore, secret_url: str, path: str, missing_ok: bool):
+    async with semaphore:
+        try:
+            async with session.get(secret_url) as response:
+                if response.status == 404:
+                    if not missing_ok:
+                        logger.error(f"Failed to read from Vault: {path} not found")
+                    return None
+                response.raise_for_status()
+                return await response.json()
+        except Exception as e:
+            logger.error(f"Failed to read from Vault: {path}: {str(e)}")
+            return None
+
+
+async def _read_secrets(url, token, paths, version_engine, mount_point, concurrency, missing_ok):
+    settings = pool_settings()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    connector = aiohttp.TCPConnector(
+        limit=max(1, concurrency),
+        force_close=not settings["keep_alive"],
+        ssl=_ssl_context(),
+    )
+    timeout = aiohttp.ClientTimeout(total=settings["timeout"])
+    headers = {"X-Vault-Token": token}
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=timeout, headers=headers, trust_env=True
+    ) as session:
+        responses = await asyncio.gather(
+            *[
+                _read_secret(
+                    session,
+                    semaphore,
+                    _secret_url(url, path, version_engine, mount_point),
+                    path,
+                    missing_ok,
+                )
+                for path in paths
+            ]
+        )
+    return dict(zip(paths, responses))
+
+
+def read_secrets(
+    url: str,
+    token: str,
+    paths: list,
+    version_engine: str = "v2",
+    mount_point: str = None,
+    concurrency: int = 8,
+    missing_ok: bool = False,
+):
+    """
+    Reads many KV secrets at once and returns a path -> raw response mapping.
+
+    Requests go straight to the KV v1 (/v1/<path>) or v2
+    (/v1/<mount_point>/data/<path>) endpoints, at most `concurrency` at a time.
+    A secret that cannot be read maps to None; missing secrets are only
+    logged when missing_ok is False.
+    """
+    return asyncio.run(
+        _read_secrets(
+            url, token, paths, version_engine, mount_point, concurrency, missing_ok
+        )
+    )
@@ -0,0 +1,24 @@
+import time
+import threading
+
+
+class RateLimiter:
+    """
+    Spaces out calls shared by several threads so that no more than `rate`
+    of them start per second. A rate of None or 0 disables the limit.
+    """
+
+    def __init__(self, rate: float = None):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
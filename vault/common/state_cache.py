@@ -0,0 +1,88 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from vault.common.tfstate import refresh_state_snapshot
+
+logger = logging.getLogger("Babylon")
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+
+class StateCache:
+    """
+    On-disk cache of tfstate outputs snapshots, shared across invocations.
+
+    Each entry holds the parsed outputs with the blob ETag and last-modified
+    time. Entries are evicted least recently used first once the directory
+    grows over max_size bytes. Outputs may contain secrets, so files are only
+    readable by the current user.
+    """
+
+    def __init__(self, directory: str = None, max_size: int = None):
+        self.directory = directory or os.environ.get(
+            "TFSTATE_CACHE_DIR",
+            os.path.join(os.path.expanduser("~"), ".cache", "backend-tf-state-to-vault"),
+        )
+        if max_size is None:
+            try:
+                max_size = int(os.environ.get("TFSTATE_CACHE_MAX_SIZE", DEFAULT_MAX_SIZE))
+            except ValueError:
+                max_size = DEFAULT_MAX_SIZE
+        self.max_size = max_size
+
+    def _path(self, key: str):
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.json")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                snapshot = json.load(f)
+            os.utime(path)
+            return snapshot
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable state cache entry {path}: {str(e)}")
+            return None
+
+    def put(self, key: str, snapshot: dict):
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, self._path(key))
+            self.evict()
+        except Exception as e:
+            logger.warning(f"Failed to write state cache: {str(e)}")
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+
+def cached_state_snapshot(blob_client, key: str, cache: StateCache = None, snapshot: dict = None):
+    """
+    Returns the state snapshot of blob_client, revalidating the in-memory
+    snapshot or else the cached entry for key with a conditional request.
+    """
+    if snapshot is None and cache is not None:
+        snapshot = cache.get(key)
+    fresh = refresh_state_snapshot(blob_client, snapshot)
+    if cache is not None and fresh is not snapshot:
+        cache.put(key, fresh)
+    return fresh
@@ -0,0 +1,228 @@
+import os
+import re
+import json
+import codecs
+import logging
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceNotFoundError,
+    ResourceNotModifiedError,
+)
+
+logger = logging.getLogger("Babylon")
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+_STRUCTURAL = re.compile(r'["{}\[\]:,]')
+_STRING_END = re.compile(r'["\\]')
+
+
+class OutputsParser:
+    """
+    Incremental parser for a Terraform state document.
+
+    Chunks of the raw document are fed one after the other. Only the text of
+    the top-level "outputs" value is kept; every other section (resources,
+    check_results, ...) is scanned and dropped as it streams by, so memory
+    does not grow with the size of the state.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key = None
+        self._key_parts = None
+        self._capture = None
+        self.outputs = None
+        self.done = False
+
+    def feed(self, chunk):
+        if self.done:
+            return self
+        text = self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        self._scan(text)
+        return self
+
+    def _scan(self, text: str):
+        i = 0
+        n = len(text)
+        key_start = 0
+        capture_start = 0
+        while i < n:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                m = _STRING_END.search(text, i)
+                if m is None:
+                    break
+                j = m.start()
+                if text[j] == "\\":
+                    self._escape = True
+                    i = j + 1
+                    continue
+                self._in_string = False
+                if self._key_parts is not None:
+                    self._key_parts.append(text[key_start:j])
+                    self._key = "".join(self._key_parts)
+                    self._key_parts = None
+                i = j + 1
+                continue
+            m = _STRUCTURAL.search(text, i)
+            if m is None:
+                break
+            j = m.start()
+            c = text[j]
+            i = j + 1
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_parts = []
+                    key_start = i
+            elif c in "{[":
+                if self._depth == 0:
+                    if c != "{":
+                        raise ValueError("Terraform state must be a JSON object")
+                    self._started = True
+                    self._expect_key = True
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0 and self._capture is not None:
+                    self._end_capture(text[capture_start:j])
+                    return
+            elif self._depth == 1 and c == ":":
+                self._expect_key = False
+                if self._key == "outputs":
+                    self._capture = []
+                    capture_start = i
+            elif self._depth == 1 and c == ",":
+                self._expect_key = True
+                if self._capture is not None:
+                    self._end_capture(text[capture_start:j])
+                    return
+        if self._key_parts is not None:
+            self._key_parts.append(text[key_start:])
+        if self._capture is not None:
+            self._capture.append(text[capture_start:])
+
+    def _end_capture(self, text: str):
+        self._capture.append(text)
+        self.outputs = json.loads("".join(self._capture))
+        self._capture = None
+        self.done = True
+
+    def close(self):
+        # Once outputs is parsed the rest is never decoded, and may end
+        # in the middle of a multibyte character
+        if not self.done:
+            self.feed(self._decoder.decode(b"", final=True))
+        if not self.done and (not self._started or self._depth != 0):
+            raise ValueError("Terraform state is empty or truncated")
+        return self.result()
+
+    def result(self):
+        return {"outputs": self.outputs} if self.outputs is not None else {}
+
+
+def load_state_outputs(chunks):
+    """
+    Streams a Terraform state and returns {"outputs": {...}} without
+    materializing the rest of the document, or {} when it has no outputs.
+    """
+    parser = OutputsParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+def _chunk_size():
+    try:
+        return int(os.environ.get("TFSTATE_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+    except ValueError:
+        return DEFAULT_CHUNK_SIZE
+
+
+def _conditions(etag: str = None):
+    if not etag:
+        return dict()
+    return dict(etag=etag, match_condition=MatchConditions.IfNotModified)
+
+
+def _download_ranges(blob_client, chunk_size: int, etag: str = None):
+    parser = OutputsParser()
+    offset = 0
+    conditions = _conditions(etag)
+    while True:
+        downloader = blob_client.download_blob(
+            offset=offset, length=chunk_size, **conditions
+        )
+        content_range = downloader.properties.content_range
+        if not content_range or "/" not in content_range:
+            raise ValueError("Blob service did not return a content range")
+        total = int(content_range.split("/")[-1])
+        # every range must come from the same version of the blob
+        conditions = _conditions(downloader.properties.etag)
+        parser.feed(downloader.readall())
+        offset += chunk_size
+        if parser.done or offset >= total:
+            break
+    logger.info(f"Read terraform state outputs from {min(offset, total)}/{total} bytes")
+    return parser.close()
+
+
+def download_state_outputs(blob_client, chunk_size: int = None, etag: str = None):
+    """
+    Downloads the state in ranged chunks and stops as soon as the top-level
+    "outputs" object is closed. Terraform writes it before "resources", so
+    only the head of the blob is fetched. Falls back to a full streamed
+    download if the ranged read does not work out. When etag is given, the
+    download fails unless the blob still matches it.
+    """
+    try:
+        return _download_ranges(blob_client, chunk_size or _chunk_size(), etag=etag)
+    except ResourceNotFoundError:
+        raise
+    except (ValueError, HttpResponseError) as e:
+        logger.warning(f"Ranged read of the state failed, downloading the full blob: {str(e)}")
+        return load_state_outputs(
+            blob_client.download_blob(**_conditions(etag)).chunks()
+        )
+
+
+def _not_modified(error: HttpResponseError):
+    return isinstance(error, ResourceNotModifiedError) or error.status_code == 304
+
+
+def refresh_state_snapshot(blob_client, snapshot: dict = None):
+    """
+    Returns a snapshot of the state outputs: dict(etag, last_modified, data).
+
+    When a previous snapshot is given, the blob is revalidated with a
+    conditional request (If-None-Match) and the same snapshot is returned
+    if the blob has not changed, without downloading it again.
+    """
+    try:
+        if snapshot:
+            properties = blob_client.get_blob_properties(
+                etag=snapshot["etag"], match_condition=MatchConditions.IfModified
+            )
+        else:
+            properties = blob_client.get_blob_properties()
+    except HttpResponseError as e:
+        if snapshot and _not_modified(e):
+            return snapshot
+        raise
+    data = download_state_outputs(blob_client, etag=properties.etag)
+    last_modified = properties.last_modified
+    return dict(
+        etag=properties.etag,
+        last_modified=last_modified.isoformat() if last_modified else None,
+        data=data,
+    )
@@ -0,0 +1,92 @@
+import os
+import logging
+import threading
+import hvac
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("Babylon")
+
+_clients = dict()
+_lock = threading.Lock()
+
+
+def _env_int(name: str, default: int):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        logger.warning(f" {name} is not a valid integer, using {default}")
+        return default
+
+
+def _env_float(name: str, default: float):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        logger.warning(f" {name} is not a valid number, using {default}")
+        return default
+
+
+def pool_settings():
+    return {
+        "pool_connections": _env_int("VAULT_POOL_CONNECTIONS", 4),
+        "pool_maxsize": _env_int("VAULT_POOL_MAXSIZE", 16),
+        "max_retries": _env_int("VAULT_MAX_RETRIES", 2),
+        "timeout": _env_float("VAULT_TIMEOUT", 30),
+        "keep_alive": os.environ.get("VAULT_KEEP_ALIVE", "true").lower() not in ("0", "false", "no"),
+    }
+
+
+def tls_settings():
+    """
+    Returns the (verify, cert) pair used for Vault requests, resolved from
+    the same environment variables as the vault CLI: VAULT_CACERT takes
+    precedence over VAULT_CAPATH, and VAULT_CLIENT_CERT/VAULT_CLIENT_KEY
+    give the client certificate.
+    """
+    verify = os.environ.get("VAULT_CACERT") or os.environ.get("VAULT_CAPATH") or True
+    cert = None
+    if os.environ.get("VAULT_CLIENT_CERT"):
+        cert = (os.environ.get("VAULT_CLIENT_CERT"), os.environ.get("VAULT_CLIENT_KEY"))
+    return verify, cert
+
+
+def _create_session(settings: dict):
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=settings["pool_connections"],
+        pool_maxsize=settings["pool_maxsize"],
+        max_retries=settings["max_retries"],
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not settings["keep_alive"]:
+        session.headers["Connection"] = "close"
+    # hvac takes the TLS settings of a custom session instead of its own
+    session.verify, session.cert = tls_settings()
+    return session
+
+
+def get_vault_client(url: str, token: str):
+    """
+    Returns the process-wide Vault client for url/token.
+
+    Every command shares one pooled requests session, so consecutive calls
+    reuse the same warm connection instead of opening a new socket each time.
+    Pool size, retries, timeout and keep-alive are tuned with the
+    VAULT_POOL_CONNECTIONS, VAULT_POOL_MAXSIZE, VAULT_MAX_RETRIES,
+    VAULT_TIMEOUT and VAULT_KEEP_ALIVE environment variables.
+    """
+    key = (url, token)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            settings = pool_settings()
+            client = hvac.Client(
+                url=url,
+                token=token,
+                timeout=settings["timeout"],
+                session=_create_session(settings),
+            )
+            _clients[key] = client
+        return client
@@ -1,7 +1,7 @@
 import os
 import sys
 import logging
-import hvac
+from vault.common.vault_client import get_vault_client
 
 logger = logging.getLogger("Babylon")
 
@@ -65,7 +65,7 @@ class DeleteConfig:
             self.delete_storage_client_secret(platform_id)
 
     def delete_config(self, schema: str):
-        client = hvac.Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
         if self.version_engine == "v1":
             print(f"deleting {self.org_name}/{schema}")
             client.delete(path=f"{self.org_name}/{schema}")
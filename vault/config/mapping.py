@@ -0,0 +1,85 @@
+import os
+import logging
+import yaml
+
+logger = logging.getLogger("Babylon")
+
+DEFAULT_MAPPING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mapping.yaml")
+
+
+def load_mapping(file_path: str = None):
+    """
+    Loads the tfstate -> Vault mapping table, see mapping.yaml for the format.
+    """
+    with open(file_path or DEFAULT_MAPPING_FILE, "r") as f:
+        mapping = yaml.safe_load(f)
+    if not isinstance(mapping, dict):
+        raise ValueError("Mapping file must contain a dictionary of sections.")
+    for section, resources in mapping.items():
+        for resource, spec in (resources or {}).items():
+            if not isinstance(spec, dict) or "path" not in spec or "fields" not in spec:
+                raise ValueError(f"Resource '{section}.{resource}' needs a path and fields.")
+    return mapping
+
+
+def load_mapping_section(section: str, file_path: str = None):
+    """
+    Returns one section (config or secrets) of the mapping table. A custom
+    mapping file without that section falls back to the default table.
+    """
+    mapping = load_mapping(file_path)
+    if section in mapping:
+        return mapping[section]
+    if file_path is None:
+        raise ValueError(f"Default mapping file has no '{section}' section.")
+    logger.warning(f"Mapping file {file_path} has no '{section}' section, using the default mapping")
+    return load_mapping()[section]
+
+
+def _is_lookup(field):
+    return isinstance(field, dict) and "output" in field
+
+
+def extract_values(resources: dict, outputs: dict):
+    """
+    Reads every output referenced by the resources in a single pass over the
+    state outputs and returns an output name -> value dict.
+    """
+    wanted = set()
+    for spec in resources.values():
+        for field in spec["fields"].values():
+            if _is_lookup(field):
+                wanted.add(field["output"])
+    return {key: outputs[key].get("value") for key in wanted if key in outputs}
+
+
+def build_payload(spec: dict, values: dict):
+    payload = dict()
+    for name, field in spec["fields"].items():
+        if not _is_lookup(field):
+            payload[name] = field
+            continue
+        if field["output"] not in values:
+            payload[name] = field.get("default", "")
+            continue
+        value = values[field["output"]]
+        payload[name] = str(value) if field.get("type") == "str" else value
+    return payload
+
+
+def build_payloads(resources: dict, outputs: dict):
+    """
+    Returns resource -> payload for every resource of a mapping section.
+    Payloads do not depend on the platform, so they can be built once and
+    written under the path of as many platforms as needed.
+    """
+    values = extract_values(resources, outputs)
+    return {resource: build_payload(spec, values) for resource, spec in resources.items()}
+
+
+def resource_path(spec: dict, **params):
+    return spec["path"].format(**params)
+
+
+def resource_paths(resources: dict, **params):
+    return {resource: resource_path(spec, **params) for resource, spec in resources.items()}
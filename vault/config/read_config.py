@@ -2,15 +2,23 @@ import os
 import sys
 import json
 import logging
-import hvac
 from azure.storage.blob import BlobServiceClient
+from vault.common.vault_client import get_vault_client
+from vault.common.async_vault import read_secrets
+from vault.common.state_cache import StateCache, cached_state_snapshot
 
 logger = logging.getLogger("Babylon")
 
 
 class ReadConfig:
 
-    def __init__(self, local_file=None, use_azure=False, version_engine: str = "v2"):
+    def __init__(
+        self,
+        local_file=None,
+        use_azure=False,
+        version_engine: str = "v2",
+        use_state_cache: bool = True,
+    ):
         for v in [
             "VAULT_ADDR",
             "VAULT_TOKEN",
@@ -47,6 +55,8 @@ class ReadConfig:
         self.local_file = local_file
         self.use_azure = use_azure and not local_file
         self.data = None
+        self.state_snapshot = None
+        self.state_cache = StateCache() if use_state_cache else None
 
         self.vault_client = None
         self.blob_client = None
@@ -81,60 +91,84 @@ class ReadConfig:
             self.blob_client = None
 
     def _init_vault(self):
-        self.vault_client = hvac.Client(url=self.server_id, token=self.token)
+        self.vault_client = get_vault_client(self.server_id, self.token)
 
-    def _read_config(self, resource: str):
+    def _read_config(self, resource: str, state: dict = None):
         if self.use_azure:
-            return self._read_from_azure(resource)
+            return self._read_from_azure(resource, state=state)
         else:
             return self._read_from_vault(f"{self.vault_prefix}/{resource}")
 
-    def _read_from_azure(self, resource):
+    def _read_azure_state(self):
+        container_client = self.blob_client.get_container_client(
+            self.storage_container
+        )
+        blob_client = container_client.get_blob_client(self.tfstate_blob_name)
+        self.state_snapshot = cached_state_snapshot(
+            blob_client,
+            key=f"{self.storage_name}/{self.storage_container}/{self.tfstate_blob_name}",
+            cache=self.state_cache,
+            snapshot=self.state_snapshot,
+        )
+        return self.state_snapshot["data"]
+
+    def _read_from_azure(self, resource, state: dict = None):
         try:
             if not self.blob_client:
                 logger.error("Azure Blob client is not initialized")
                 return {}
-            container_client = self.blob_client.get_container_client(
-                self.storage_container
-            )
-            blob_client = container_client.get_blob_client(self.tfstate_blob_name)
-            blob_data = blob_client.download_blob().readall()
-            if not blob_data:
+            data = state if state is not None else self._read_azure_state()
+            if not data:
                 logger.warning(f"No data found in Azure Blob for resource: {resource}")
                 return {}
-            data = json.loads(blob_data)
             return data.get("outputs", {}).get(resource, {}).get("value", {})
         except Exception as e:
             logger.error(f"Failed to read from Azure: {str(e)}")
             return {}
 
+    def _outputs_from_response(self, schema, response):
+        resource = schema.split("/")[-1]
+        if not response or "data" not in response:
+            return {}
+        data = response["data"]
+        if self.version_engine != "v1":
+            if not isinstance(data, dict) or "data" not in data:
+                return {}
+            data = data["data"]
+        if not isinstance(data, dict):
+            return {}
+        output = dict()
+        for i, k in data.items():
+            output.setdefault(f"out_{resource}_{i}", dict(value=k))
+        return {"outputs": output}
+
     def _read_from_vault(self, schema):
         try:
-            resource = schema.split("/")[-1]
             if self.version_engine == "v1":
                 response = self.vault_client.read(path=schema)
-                data = response.get("data")
-                output = dict()
-                for i, k in data.items():
-                    output.setdefault(f"out_{resource}_{i}", dict(value=k))
-                return {"outputs": output} if "data" in response else {}
             else:
                 response = self.vault_client.secrets.kv.v2.read_secret_version(
                     path=schema, mount_point=self.org_name
                 )
-                data = response.get("data").get("data")
-                output = dict()
-                for i, k in data.items():
-                    output.setdefault(f"out_{resource}_{i}", dict(value=k))
-            return (
-                {"outputs": output}
-                if "data" in response and "data" in response["data"]
-                else {}
-            )
+            return self._outputs_from_response(schema, response)
         except Exception as e:
             logger.error(f"Failed to read from Vault: {str(e)}")
             return {}
 
+    def _bulk_read_from_vault(self, schemas: dict, concurrency: int = 8):
+        responses = read_secrets(
+            url=self.server_id,
+            token=self.token,
+            paths=list(schemas.values()),
+            version_engine=self.version_engine,
+            mount_point=self.org_name,
+            concurrency=concurrency,
+        )
+        return {
+            key: self._outputs_from_response(schema, responses.get(schema))
+            for key, schema in schemas.items()
+        }
+
     def get_config(self, resource: str):
         if resource == "acr":
             self._read_config(f"{self.prefix}/{resource}")
@@ -168,12 +202,16 @@ The resource should be ['acr', 'adt', 'adx', 'api', 'app', 'azure', 'babylon', '
             return None
 
     def read_babylon_client_secret(self):
-        return self._read_from_vault(f"{self.prefix_client}/client")
+        return self._read_from_vault(self._babylon_client_secret_path())
 
     def read_storage_client_secret(self):
-        return self._read_from_vault(
-            f"{self.prefix_platform}/{self.platform_id}/storage/account"
-        )
+        return self._read_from_vault(self._storage_client_secret_path())
+
+    def _babylon_client_secret_path(self):
+        return f"{self.prefix_client}/client"
+
+    def _storage_client_secret_path(self):
+        return f"{self.prefix_platform}/{self.platform_id}/storage/account"
 
     def read_acr(self, resource):
         return self._read_config(f"{self.prefix}/{resource}")
@@ -208,7 +246,7 @@ The resource should be ['acr', 'adt', 'adx', 'api', 'app', 'azure', 'babylon', '
     def read_webapp(self, resource):
         return self._read_config(f"{self.prefix}/{resource}")
 
-    def read_all_config(self):
+    def read_all_config(self, concurrency: int = 8):
         logger.info("Reading all config")
         resources = [
             "acr",
@@ -223,7 +261,24 @@ The resource should be ['acr', 'adt', 'adx', 'api', 'app', 'azure', 'babylon', '
             "powerbi",
             "webapp",
         ]
-        data = {resource: self._read_config(resource) for resource in resources}
+        if self.vault_client:
+            schemas = {
+                resource: f"{self.vault_prefix}/{resource}" for resource in resources
+            }
+            schemas["client"] = self._babylon_client_secret_path()
+            schemas["storage"] = self._storage_client_secret_path()
+            return self._bulk_read_from_vault(schemas, concurrency=concurrency)
+        state = None
+        if self.use_azure and self.blob_client:
+            try:
+                state = self._read_azure_state()
+            except Exception as e:
+                logger.error(f"Failed to read from Azure: {str(e)}")
+                state = {}
+        data = {
+            resource: self._read_config(resource, state=state)
+            for resource in resources
+        }
         data["client"] = self.read_babylon_client_secret()
         data["storage"] = self.read_storage_client_secret()
         return data
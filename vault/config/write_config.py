@@ -2,12 +2,29 @@ import os
 import sys
 import json
 import logging
-import hvac
+import yaml
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from azure.storage.blob import BlobServiceClient
+from vault.common.vault_client import get_vault_client
+from vault.common.async_vault import read_secrets
+from vault.common.state_cache import StateCache, cached_state_snapshot
+from vault.config.mapping import load_mapping_section, build_payloads, resource_path
 
 logger = logging.getLogger("Babylon")
 
 
+def read_platform_manifest(file_path: str):
+    with open(file_path, "r") as f:
+        manifest = yaml.safe_load(f)
+    if isinstance(manifest, dict):
+        manifest = manifest.get("platforms")
+    if not isinstance(manifest, list):
+        raise ValueError(
+            "Platform manifest must be a list of platform ids or contain a 'platforms' list."
+        )
+    return [str(p) for p in manifest if p]
+
+
 class WriteConfig:
 
     def __init__(
@@ -16,6 +33,9 @@ class WriteConfig:
         local_file=None,
         use_azure=False,
         from_tfstate: bool = False,
+        use_state_cache: bool = True,
+        skip_unchanged: bool = False,
+        mapping_file: str = None,
     ):
         for v in [
             "VAULT_ADDR",
@@ -33,6 +53,7 @@ class WriteConfig:
 
         self.version_engine = version_engine
         self.from_tfstate = from_tfstate
+        self.skip_unchanged = skip_unchanged
         self.server_id = os.environ.get("VAULT_ADDR")
         self.token = os.environ.get("VAULT_TOKEN")
         self.org_name = os.environ.get("ORGANIZATION_NAME")
@@ -45,9 +66,15 @@ class WriteConfig:
 
         self.local_file = local_file
         self.use_azure = use_azure and not local_file
-        self.vault_client = hvac.Client(url=self.server_id, token=self.token)
+        self.vault_client = get_vault_client(self.server_id, self.token)
         self.blob_client = None
         self.secrets = None
+        self.state_cache = StateCache() if use_state_cache else None
+        self.pending = None
+        self.pending_platforms = dict()
+        self.report = None
+        self.mapping = load_mapping_section("config", mapping_file)
+        self.payloads = None
 
         if self.use_azure:
             self._init_blob_client()
@@ -92,8 +119,12 @@ class WriteConfig:
                 )
                 blob_client = container_client.get_blob_client(self.tfstate_blob_name)
                 try:
-                    self.state = blob_client.download_blob().readall()
-                    self.data = json.loads(self.state)
+                    snapshot = cached_state_snapshot(
+                        blob_client,
+                        key=f"{self.storage_name}/{self.storage_container}/{self.tfstate_blob_name}",
+                        cache=self.state_cache,
+                    )
+                    self.data = snapshot["data"] or {"outputs": {}}
                 except Exception as e:
                     logger.info(
                         f"Blob not found or invalid. Creating new state. Error: {str(e)}"
@@ -103,10 +134,14 @@ class WriteConfig:
             logger.error(f"Failed to access Azure Blob: {str(e)}")
             # self.data = {"outputs": {}}
 
-    def upload_config(self, schema: str, data: dict):
+    def upload_config(self, schema: str, data: dict, platform_id: str = None):
         schema_ = schema
         if self.version_engine == "v1":
             schema_ = f"{self.org_name}/{schema}"
+        if self.pending is not None:
+            self.pending[schema_] = data
+            self.pending_platforms[schema_] = platform_id
+            return
         self._write_to_vault(schema=schema_, data=data)
 
     def _write_to_local(self, key: str, data: dict):
@@ -118,294 +153,165 @@ class WriteConfig:
         except Exception as e:
             logger.error(f"Failed to write to local file: {str(e)}")
 
-    def _write_to_azure(self, key: str, data: dict):
-        try:
-            self.data.setdefault("outputs", {})[key] = {"value": data}
-            container_client = self.blob_client.get_container_client(
-                self.storage_container
+    def _vault_write(self, schema: str, data: dict):
+        if self.version_engine == "v1":
+            self.vault_client.write(path=schema, **data)
+        else:
+            self.vault_client.secrets.kv.v2.create_or_update_secret(
+                path=schema, secret=data, mount_point=self.org_name
             )
-            blob_client = container_client.get_blob_client(self.tfstate_blob_name)
-            blob_client.upload_blob(json.dumps(self.data), overwrite=True)
-            logger.info(f"Successfully wrote {key} to Azure Blob")
-        except Exception as e:
-            logger.error(f"Failed to write to Azure Blob: {str(e)}")
 
     def _write_to_vault(self, schema: str, data: dict):
         try:
-            if self.version_engine == "v1":
-                self.vault_client.write(path=schema, **data)
-            else:
-                self.vault_client.secrets.kv.v2.create_or_update_secret(
-                    path=schema, secret=data, mount_point=self.org_name
-                )
+            self._vault_write(schema=schema, data=data)
             print(f"Successfully wrote {schema} to Vault")
         except Exception as e:
             logger.error(f"Failed to write to Vault: {str(e)}")
 
-    def set_babylon_client_secret(self, platform_id: str):
-        data = self.data
-        babylon_secret = (
-            ""
-            if "out_babylon_sp_client_secret" not in data["outputs"]
-            else data["outputs"]["out_babylon_sp_client_secret"]["value"]
+    def _read_current(self, schemas: list, parallel: int = 1):
+        responses = read_secrets(
+            url=self.server_id,
+            token=self.token,
+            paths=schemas,
+            version_engine=self.version_engine,
+            mount_point=self.org_name,
+            concurrency=parallel,
+            missing_ok=True,
         )
-        client_secret = dict(secret=babylon_secret)
-        self.upload_config(f"{self.prefix_client}/{platform_id}/client", client_secret)
-        return self
+        current = dict()
+        for schema, response in responses.items():
+            data = (response or {}).get("data")
+            if self.version_engine != "v1" and isinstance(data, dict):
+                data = data.get("data")
+            current[schema] = data
+        return current
 
-    def set_storage_client_secret(self, platform_id: str):
-        data = self.data
-        storage_acc_secret = (
-            ""
-            if "out_azure_storage_account_key" not in data["outputs"]
-            else data["outputs"]["out_azure_storage_account_key"]["value"]
+    def _write_pending(self, parallel: int = 1):
+        pending, self.pending = self.pending or {}, None
+        report = {"written": [], "unchanged": [], "failed": {}}
+        if self.skip_unchanged and pending:
+            current = self._read_current(list(pending), parallel=parallel)
+            report["unchanged"] = [
+                schema for schema, data in pending.items() if current.get(schema) == data
+            ]
+            for schema in report["unchanged"]:
+                del pending[schema]
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+            futures = {
+                executor.submit(self._vault_write, schema, data): schema
+                for schema, data in pending.items()
+            }
+            for future in as_completed(futures):
+                schema = futures[future]
+                try:
+                    future.result()
+                    report["written"].append(schema)
+                except Exception as e:
+                    report["failed"][schema] = str(e)
+        for schema in sorted(report["written"]):
+            print(f"Successfully wrote {schema} to Vault")
+        for schema, error in sorted(report["failed"].items()):
+            logger.error(f"Failed to write {schema} to Vault: {error}")
+        print(
+            f"Summary: {len(report['written'])} written, {len(report['unchanged'])} unchanged, "
+            f"{len(report['failed'])} failed"
         )
-        client_secret = dict(secret=storage_acc_secret)
-        self.upload_config(
-            f"{self.prefix_platform}/{platform_id}/storage/account", client_secret
+        return report
+
+    def _mapped_payloads(self):
+        if self.payloads is None:
+            self.payloads = build_payloads(self.mapping, self.data.get("outputs", {}))
+        return self.payloads
+
+    def _write_resource(self, resource: str, platform_id: str):
+        path = resource_path(
+            self.mapping[resource],
+            tenant_id=self.tenant_id,
+            platform_id=platform_id,
+            cluster_name=self.cluster_name,
         )
+        self.upload_config(path, self._mapped_payloads()[resource], platform_id=platform_id)
         return self
 
+    def set_babylon_client_secret(self, platform_id: str):
+        return self._write_resource("client", platform_id)
+
+    def set_storage_client_secret(self, platform_id: str):
+        return self._write_resource("storage", platform_id)
+
     def write_acr(self, platform_id):
-        data = self.data
-        acr_login_server = (
-            ""
-            if "out_acr_login_server" not in data["outputs"]
-            else data["outputs"]["out_acr_login_server"]["value"]
-        )
-        acr = {
-            "login_server": acr_login_server,
-            "simulator_repository": "",
-            "simulator_version": "",
-        }
-        self.upload_config(f"{self.prefix}/{platform_id}/acr", acr)
-        return self
+        return self._write_resource("acr", platform_id)
 
     def write_adt(self, platform_id):
-        adt = {
-            "built_owner_id": "bcd981a7-7f74-457b-83e1-cceb9e632ffe",
-            "built_reader_id": "d57506d4-4c8d-48b1-8587-93c323f6a5a3",
-            "digital_twin_url": "",
-        }
-        self.upload_config(f"{self.prefix}/{platform_id}/adt", adt)
-        return self
+        return self._write_resource("adt", platform_id)
 
     def write_app(self, platform_id):
-        app = {"app_id": "", "name": "", "object_id": "", "principal_id": ""}
-        self.upload_config(f"{self.prefix}/{platform_id}/app", app)
-        return self
+        return self._write_resource("app", platform_id)
 
     def write_adx(self, platform_id):
-        data = self.data
-        cluster_name = (
-            ""
-            if "out_adx_cluster_name" not in data["outputs"]
-            else data["outputs"]["out_adx_cluster_name"]["value"]
-        )
-        adx_uri = (
-            ""
-            if "out_adx_cluster_uri" not in data["outputs"]
-            else data["outputs"]["out_adx_cluster_uri"]["value"]
-        )
-        cluster_principal_id = (
-            ""
-            if "out_adx_cluster_principal_id" not in data["outputs"]
-            else data["outputs"]["out_adx_cluster_principal_id"]["value"]
-        )
-        adx = {
-            "built_contributor_id": "b24988ac-6180-42a0-ab88-20f7382dd24c",
-            "built_owner_id": "8e3af657-a8ff-443c-a75c-2fe8c4bcb635",
-            "cluster_name": cluster_name,
-            "cluster_principal_id": cluster_principal_id,
-            "cluster_uri": adx_uri,
-            "database_name": "",
-        }
-        self.upload_config(f"{self.prefix}/{platform_id}/adx", adx)
-        return self
+        return self._write_resource("adx", platform_id)
 
     def write_api(self, platform_id):
-        data = self.data
-        scope = (
-            ""
-            if "out_api_cosmo_scope" not in data["outputs"]
-            else f"{data['outputs']['out_api_cosmo_scope']['value']}"
-        )
-        url = (
-            ""
-            if "out_api_cosmo_url" not in data["outputs"]
-            else f"{data['outputs']['out_api_cosmo_url']['value']}"
-        )
-        api = {
-            "connector.adt_id": "",
-            "connector.adt_version": "",
-            "connector.storage_id": "",
-            "connector.storage_version": "",
-            "connector.twin_id": "",
-            "connector.twin_version": "",
-            "dataset.adt_id": "",
-            "dataset.storage_id": "",
-            "dataset.twin_id": "",
-            "organization_id": "",
-            "organization_url": "",
-            "run_templates": "",
-            "scope": scope,
-            "send_scenario_metadata_to_event_hub": True,
-            "solution_id": "",
-            "url": url,
-            "use_dedicated_event_hub_namespace": True,
-            "workspace_id": "",
-            "workspace_key": "",
-        }
-        self.upload_config(f"{self.prefix}/{platform_id}/api", api)
-        return self
+        return self._write_resource("api", platform_id)
 
     def write_azure(self, platform_id):
-        data = self.data
-        resource_group_name = (
-            ""
-            if "out_azure_tenant_resource_group" not in data["outputs"]
-            else data["outputs"]["out_azure_tenant_resource_group"]["value"]
-        )
-        resource_location = (
-            ""
-            if "out_azure_resource_location" not in data["outputs"]
-            else data["outputs"]["out_azure_resource_location"]["value"]
-        )
-        storage_account_name = (
-            ""
-            if "out_azure_storage_account_name" not in data["outputs"]
-            else data["outputs"]["out_azure_storage_account_name"]["value"]
-        )
-        subscription_id = (
-            ""
-            if "out_azure_subscription_id" not in data["outputs"]
-            else data["outputs"]["out_azure_subscription_id"]["value"]
-        )
-        azure = {
-            "cli_client_id": "04b07795-8ddb-461a-bbee-02f9e1bf7b46",
-            "email": "",
-            "eventhub_built_contributor_id": "b24988ac-6180-42a0-ab88-20f7382dd24c",
-            "eventhub_built_data_receiver": "a638d3c7-ab3a-418d-83e6-5f17a39d4fde",
-            "eventhub_built_data_sender": "2b629674-e913-4c01-ae53-ef4638d8f975",
-            "function_artifact_url": "",
-            "resource_group_name": resource_group_name,
-            "resource_location": resource_location,
-            "storage_account_name": storage_account_name,
-            "storage_blob_reader": "2a2b9908-6ea1-4ae2-8e65-a410df84e7d1",
-            "subscription_id": subscription_id,
-            "team_id": "",
-            "user_principal_id": "",
-        }
-        self.upload_config(f"{self.prefix}/{platform_id}/azure", azure)
-        return self
+        return self._write_resource("azure", platform_id)
 
     def write_babylon(self, platform_id):
-        data = self.data
-        babylon_client_id = (
-            ""
-            if "out_babylon_sp_client_id" not in data["outputs"]
-            else data["outputs"]["out_babylon_sp_client_id"]["value"]
-        )
-        babylon_principal_id = (
-            ""
-            if "out_babylon_sp_object_id" not in data["outputs"]
-            else data["outputs"]["out_babylon_sp_object_id"]["value"]
-        )
-        babylon = {"client_id": babylon_client_id, "principal_id": babylon_principal_id}
-        self.upload_config(f"{self.prefix}/{platform_id}/babylon", babylon)
-        return self
+        return self._write_resource("babylon", platform_id)
 
     def write_github(self, platform_id):
-        github = {
-            "branch": "",
-            "organization": "",
-            "repository": "",
-            "run_url": "",
-            "workflow_path": "",
-        }
-        self.upload_config(f"{self.prefix}/{platform_id}/github", github)
-        return self
+        return self._write_resource("github", platform_id)
 
     def write_plaftorm(self, platform_id):
-        data = self.data
-        platform_sp_client_id = (
-            ""
-            if "out_tenant_sp_client_id" not in data["outputs"]
-            else data["outputs"]["out_tenant_sp_client_id"]["value"]
-        )
-        platform_sp_object_id = (
-            ""
-            if "out_tenant_sp_object_id" not in data["outputs"]
-            else data["outputs"]["out_tenant_sp_object_id"]["value"]
-        )
-        platform = {
-            "app_id": platform_sp_client_id,
-            "principal_id": platform_sp_object_id,
-            "scope_id": "6332363e-bcba-4c4a-a605-c25f23117400",
-        }
-        self.upload_config(f"{self.prefix}/{platform_id}/platform", platform)
-        return self
+        return self._write_resource("platform", platform_id)
 
     def write_powerbi(self, platform_id):
-        powerbi = {
-            "scope": "https://analysis.windows.net/powerbi/api/.default",
-            "dashboard_view": "",
-            "group_id": "",
-            "scena_write_to_azurerio_view": "",
-            "workspace.id": "",
-            "workspace.name": "",
-        }
-        self.upload_config(f"{self.prefix}/{platform_id}/powerbi", powerbi)
-        return self
+        return self._write_resource("powerbi", platform_id)
 
     def write_webapp(self, platform_id):
-        webapp = {
-            "deployment_name": "",
-            "enable_insights": False,
-            "hostname": "",
-            "insights_instrumentation_key": "",
-            "location": "",
-            "static_domain": "",
-        }
-        self.upload_config(f"{self.prefix}/{platform_id}/webapp", webapp)
+        return self._write_resource("webapp", platform_id)
+
+    def write_all_config(self, platform_id: str, parallel: int = 1):
+        self.pending = dict()
+        self._queue_all_config(platform_id=platform_id)
+        self.report = self._write_pending(parallel=parallel)
+        return self
+
+    def write_platforms(self, platform_ids: list, resource: str = "all", parallel: int = 1):
+        self.pending = dict()
+        self.pending_platforms = dict()
+        for platform_id in platform_ids:
+            if resource == "all":
+                self._queue_all_config(platform_id=platform_id)
+            else:
+                self.write_config(resource=resource, platform_id=platform_id)
+        self.report = self._write_pending(parallel=parallel)
+        platforms = dict()
+        for platform_id in platform_ids:
+            written = [s for s in self.report["written"] if self.pending_platforms.get(s) == platform_id]
+            failed = [s for s in self.report["failed"] if self.pending_platforms.get(s) == platform_id]
+            unchanged = [s for s in self.report["unchanged"] if self.pending_platforms.get(s) == platform_id]
+            platforms[platform_id] = {
+                "written": len(written),
+                "unchanged": len(unchanged),
+                "failed": len(failed),
+            }
+            print(
+                f"{platform_id}: {len(written)} written, {len(unchanged)} unchanged, {len(failed)} failed"
+            )
+        self.report["platforms"] = platforms
         return self
 
-    def write_all_config(self, platform_id: str):
-        self.write_acr(platform_id=platform_id)
-        self.write_adt(platform_id=platform_id)
-        self.write_app(platform_id=platform_id)
-        self.write_adx(platform_id=platform_id)
-        self.write_api(platform_id=platform_id)
-        self.write_azure(platform_id=platform_id)
-        self.write_babylon(platform_id=platform_id)
-        self.write_github(platform_id=platform_id)
-        self.write_plaftorm(platform_id=platform_id)
-        self.write_powerbi(platform_id=platform_id)
-        self.write_webapp(platform_id=platform_id)
-        self.set_storage_client_secret(platform_id=platform_id)
-        self.set_babylon_client_secret(platform_id=platform_id)
+    def _queue_all_config(self, platform_id: str):
+        for resource in self.mapping:
+            self._write_resource(resource, platform_id)
         return self
 
     def write_config(self, resource: str, platform_id: str):
-        if resource == "acr":
-            self.write_acr(platform_id=platform_id)
-        if resource == "adt":
-            self.write_adt(platform_id=platform_id)
-        if resource == "adx":
-            self.write_adx(platform_id=platform_id)
-        if resource == "app":
-            self.write_app(platform_id=platform_id)
-        if resource == "api":
-            self.write_api(platform_id=platform_id)
-        if resource == "azure":
-            self.write_azure(platform_id=platform_id)
-        if resource == "babylon":
-            self.write_babylon(platform_id=platform_id)
-        if resource == "github":
-            self.write_github(platform_id=platform_id)
-        if resource == "platform":
-            self.write_plaftorm(platform_id=platform_id)
-        if resource == "powerbi":
-            self.write_powerbi(platform_id=platform_id)
-        if resource == "webapp":
-            self.write_webapp(platform_id=platform_id)
+        if resource not in self.mapping:
+            logger.error(
+                f"Unknown resource '{resource}', expected one of: {', '.join(self.mapping)}"
+            )
+            return self
+        return self._write_resource(resource, platform_id)
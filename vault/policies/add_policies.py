@@ -3,6 +3,9 @@ import sys
 import os
 import hvac
 import yaml
+from vault.common.vault_client import get_vault_client
+from vault.policies.sync_policies import sync_policies
+from vault.policies.render_policies import render_policies
 
 logger = logging.getLogger("Babylon")
 
@@ -37,12 +40,14 @@ class AddPolicies:
         self.storage_container = os.environ.get("STORAGE_CONTAINER")
         self.tfstate_blob_name = os.environ.get("TFSTATE_BLOB_NAME")
 
-    def add_policies_from_file(self, file_path):
-        client = hvac.Client(url=self.server_id, token=self.token)
+    def add_policies_from_file(self, file_path, parallel: int = 8, orgs: list = None):
+        client = get_vault_client(self.server_id, self.token)
         """
         Adds policies to Vault from a YAML file.
 
         :param file_path: Path to the YAML file containing policies
+        :param orgs: (org, tenant) pairs to render the templated policies for,
+            default: the current organization and tenant
         """
         if not os.path.isfile(file_path):
             print(f"File not found: {file_path}")
@@ -55,23 +60,24 @@ class AddPolicies:
             if not isinstance(policies, dict):
                 raise ValueError("YAML file must contain a dictionary of policies.")
 
+            valid = dict()
             for policy_name, policy_rules in policies.items():
                 if not policy_name or not policy_rules:
                     print(f"Skipping invalid policy: {policy_name}")
                     continue
-                # Check if the policy already exists
-                try:
-                    existing_policy = client.sys.read_policy(name=policy_name)
-                    if existing_policy:
-                        print(f"Policy '{policy_name}' already exists. Skipping creation.")
-                        continue
-                except hvac.exceptions.InvalidPath:
-                    # If the policy does not exist, an InvalidPath exception is raised.
-                    print(f"Policy '{policy_name}' does not exist. Creating new policy.")
+                valid[policy_name] = policy_rules
+            valid = render_policies(valid, orgs or [(self.org_name, self.tenant_id)])
 
-                # Add or update the policy in Vault
-                client.sys.create_or_update_policy(name=policy_name, policy=policy_rules)
-                print(f"Policy '{policy_name}' has been added or updated successfully.")
+            # Existing policies are left untouched, only missing ones are created
+            report = sync_policies(client, valid, update=False, parallel=parallel)
+            for policy_name in report["unchanged"]:
+                print(f"Policy '{policy_name}' already exists. Skipping creation.")
+            for policy_name in report["created"]:
+                print(f"Policy '{policy_name}' has been added successfully.")
+            print(
+                f"Summary: {len(report['created'])} created, {len(report['updated'])} updated, "
+                f"{len(report['unchanged'])} unchanged, {len(report['failed'])} failed"
+            )
 
         except yaml.YAMLError as e:
             print(f"Error parsing YAML file: {e}")
@@ -1,7 +1,7 @@
 import logging
 import sys
 import os
-from hvac import Client
+from vault.common.vault_client import get_vault_client
 
 logger = logging.getLogger("Babylon")
 
@@ -37,7 +37,7 @@ class AddPlocies:
         self.tfstate_blob_name = os.environ.get("TFSTATE_BLOB_NAME")
 
     def create_policies(self):
-        client = Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
         admin_policy = f"""
         path "{self.org_name}/{self.tenant_id}/*" {{
             capabilities = ["create", "read", "update", "delete", "list"]
@@ -2,6 +2,7 @@ import logging
 import sys
 import os
 import hvac
+from vault.common.vault_client import get_vault_client
 
 logger = logging.getLogger("Babylon")
 
@@ -37,7 +38,7 @@ class DeletePolicies:
         self.tfstate_blob_name = os.environ.get("TFSTATE_BLOB_NAME")
 
     def delete_policy(self, policy_name):
-        client = hvac.Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
 
         try:
             # Delete the policy
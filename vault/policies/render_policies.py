@@ -0,0 +1,76 @@
+import re
+from functools import lru_cache
+
+# HCL blocks use braces, so placeholders are substituted with a regex
+# rather than str.format
+PLACEHOLDER = re.compile(r"\{self\.(org_name|tenant_id)\}")
+
+
+@lru_cache(maxsize=None)
+def compile_template(rules: str):
+    """
+    Splits policy rules into literal text and placeholder names, once per
+    distinct template.
+    """
+    parts = []
+    position = 0
+    for match in PLACEHOLDER.finditer(rules):
+        parts.append((False, rules[position:match.start()]))
+        parts.append((True, match.group(1)))
+        position = match.end()
+    parts.append((False, rules[position:]))
+    return tuple(parts)
+
+
+def is_template(rules: str):
+    return len(compile_template(rules)) > 1
+
+
+def render_template(rules: str, org_name: str, tenant_id: str):
+    values = dict(org_name=org_name, tenant_id=tenant_id)
+    return "".join(values[text] if placeholder else text for placeholder, text in compile_template(rules))
+
+
+def policy_role(name: str):
+    """
+    Returns the role of a templated policy: cosmotech_admin -> admin,
+    contributor_policy -> contributor.
+    """
+    if name.startswith("cosmotech_"):
+        name = name[len("cosmotech_"):]
+    if name.endswith("_policy"):
+        name = name[:-len("_policy")]
+    return name
+
+
+def parse_orgs(orgs: str):
+    """
+    Parses "org:tenant,org:tenant" into a list of (org, tenant) pairs.
+    """
+    pairs = []
+    for item in orgs.split(","):
+        if not item.strip():
+            continue
+        org_name, _, tenant_id = item.strip().partition(":")
+        if not org_name or not tenant_id:
+            raise ValueError(f"Invalid organization '{item}', expected <org>:<tenant>.")
+        pairs.append((org_name, tenant_id))
+    return pairs
+
+
+def render_policies(policies: dict, orgs: list):
+    """
+    Renders policy name -> rules for every (org, tenant) pair.
+
+    Templated policies become <org>_<role> per organization, as in
+    add_policies_version1. Policies without placeholders are kept once
+    under their own name.
+    """
+    rendered = dict()
+    for name, rules in policies.items():
+        if not is_template(rules):
+            rendered[name] = rules
+            continue
+        for org_name, tenant_id in orgs:
+            rendered[f"{org_name}_{policy_role(name)}"] = render_template(rules, org_name, tenant_id)
+    return rendered
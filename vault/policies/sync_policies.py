@@ -0,0 +1,67 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("Babylon")
+
+
+def normalize_policy(rules: str):
+    """
+    Returns the policy rules without trailing spaces and blank lines, so
+    rules that only differ in layout compare equal.
+    """
+    lines = [line.rstrip() for line in (rules or "").strip().splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+def policy_hash(rules: str):
+    return hashlib.sha256(normalize_policy(rules).encode("utf-8")).hexdigest()
+
+
+def _read_rules(client, name: str):
+    try:
+        result = client.sys.read_policy(name=name)
+    except Exception as e:
+        logger.warning(f"Failed to read policy '{name}': {str(e)}")
+        return None
+    return result.get("data", result).get("rules")
+
+
+def sync_policies(client, policies: dict, update: bool = True, parallel: int = 8):
+    """
+    Pushes policy name -> rules to Vault and returns the names that were
+    created, updated, left unchanged or failed.
+
+    Existing policies are listed once. With update, only the existing ones
+    in policies are read back, and a policy is rewritten only when the hash
+    of its normalized rules differs; without update, existing policies are
+    left as they are. Reads and writes run `parallel` at a time.
+    """
+    report = dict(created=[], updated=[], unchanged=[], failed=[])
+    existing = set(client.sys.list_policies()["policies"])
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+        known = [name for name in policies if name in existing]
+        current = dict(zip(known, executor.map(lambda name: _read_rules(client, name), known))) if update else {}
+
+        pending = dict()
+        for name, rules in policies.items():
+            if name not in existing:
+                pending[name] = "created"
+            elif update and (current[name] is None or policy_hash(current[name]) != policy_hash(rules)):
+                pending[name] = "updated"
+            else:
+                report["unchanged"].append(name)
+
+        def _write(name):
+            client.sys.create_or_update_policy(name=name, policy=policies[name])
+            return name
+
+        futures = {name: executor.submit(_write, name) for name in pending}
+        for name, future in futures.items():
+            try:
+                future.result()
+                report[pending[name]].append(name)
+            except Exception as e:
+                logger.error(f"Failed to write policy '{name}': {str(e)}")
+                report["failed"].append(name)
+    return report
@@ -3,15 +3,17 @@ import json
 import logging
 import sys
 import os
-import hvac
 from azure.storage.blob import BlobServiceClient
+from vault.common.vault_client import get_vault_client
+from vault.common.state_cache import StateCache, cached_state_snapshot
+from vault.config.mapping import load_mapping_section, build_payloads, resource_path
 
 logger = logging.getLogger("Babylon")
 
 
 class AddSecrets:
 
-    def __init__(self):
+    def __init__(self, use_state_cache: bool = True, mapping_file: str = None):
         for v in [
                 "VAULT_ADDR",
                 "VAULT_TOKEN",
@@ -38,6 +40,8 @@ class AddSecrets:
         self.storage_secret = os.environ.get("STORAGE_ACCOUNT_KEY")
         self.storage_container = os.environ.get("STORAGE_CONTAINER")
         self.tfstate_blob_name = os.environ.get("TFSTATE_BLOB_NAME")
+        self.state_cache = StateCache() if use_state_cache else None
+        self.mapping = load_mapping_section("secrets", mapping_file)
 
         self.secrets = None
 
@@ -47,7 +51,7 @@ class AddSecrets:
                 self.secrets = json.loads(f.read())
         else:
             self.dowload_ftstate()
-            self.secrets = json.loads(self.state)
+            self.secrets = self.state
 
         if self.secrets is None:
             logger.error("secrets is missing")
@@ -65,10 +69,13 @@ class AddSecrets:
         try:
             service = self.blob_client.get_container_client(container=self.storage_container)
             blob = service.get_blob_client(blob=self.tfstate_blob_name)
-            state = blob.download_blob(encoding="utf-8").content_as_bytes()
-            self.state = state
+            self.state = cached_state_snapshot(
+                blob,
+                key=f"{self.storage_name}/{self.storage_container}/{self.tfstate_blob_name}",
+                cache=self.state_cache,
+            )["data"]
         except Exception:
-            self.state = "{}"
+            self.state = {}
             logger.info("blob not found")
 
     # def upload_config(self, schema: str, data: dict):
@@ -77,7 +84,7 @@ class AddSecrets:
     #     return self
 
     def upload_secrets(self, schema: str, data: dict):
-        client = hvac.Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
         client.secrets.kv.v2.create_or_update_secret(path=schema, secret=data, mount_point=self.org_name)
         return self
 
@@ -91,7 +98,7 @@ class AddSecrets:
                 self.secrets = json.loads(f.read())
         else:
             self.dowload_ftstate()
-            self.secrets = json.loads(self.state)
+            self.secrets = self.state
 
         if self.secrets is None:
             logger.error("secrets is missing")
@@ -99,75 +106,13 @@ class AddSecrets:
 
     def add_patform_secrets(self, file_path):
         self.check_file_secret(file_path)
-        api_version = self.get_output_value("out_API_VERSION")
-        acr_server = self.get_output_value("out_ACR_SERVER")
-        acr_username = self.get_output_value("out_ACR_USERNAME")
-        acr_password = self.get_output_value("out_ACR_PASSWORD")
-        acr_registry_url = self.get_output_value("out_ACR_REGISTRY_URL")
-        host_cosmotech_api = self.get_output_value("out_HOST_COSMOTECH_API")
-        identity_authorization_url = self.get_output_value("out_IDENTITY_AUTHORIZATION_URL")
-        identity_token_url = self.get_output_value("out_IDENTITY_TOKEN_URL")
-        monitoring_namespace = self.get_output_value("out_MONITORING_NAMESPACE")
-        namespace = self.get_output_value("out_NAMESPACE")
-        argo_service_account_name = self.get_output_value("out_ARGO_SERVICE_ACCOUNT_NAME")
-        azure_tenant_id = self.get_output_value("out_AZURE_TENANT_ID")
-        azure_appid_uri = self.get_output_value("out_AZURE_APPID_URI")
-        azure_storage_account_key = self.get_output_value("out_AZURE_STORAGE_ACCOUNT_KEY")
-        azure_storage_account_name = self.get_output_value("out_AZURE_STORAGE_ACCOUNT_NAME")
-        azure_credentials_client_id = self.get_output_value("out_AZURE_CREDENTIALS_CLIENT_ID")
-        azure_credentials_client_secret = self.get_output_value("out_AZURE_CREDENTIALS_CLIENT_SECRET")
-        azure_credentials_customer_client_id = self.get_output_value("out_AZURE_CREDENTIALS_CUSTOMER_CLIENT_ID")
-        azure_credentials_customer_client_secret = self.get_output_value("out_AZURE_CREDENTIALS_CUSTOMER_CLIENT_SECRET")
-        adx_base_uri = self.get_output_value("out_ADX_BASE_URI")
-        adx_ingest_uri = self.get_output_value("out_ADX_INGEST_URI")
-        eventbus_base_uri = self.get_output_value("out_EVENTBUS_BASE_URI")
-        host_postgres = self.get_output_value("out_HOST_POSTGRES")
-        host_redis = self.get_output_value("out_HOST_REDIS")
-        host_redis_password = self.get_output_value("out_HOST_REDIS_PASSWORD")
-        host_argo_workflows_server = self.get_output_value("out_HOST_ARGO_WORKFLOWS_SERVER")
-        rds_hub_listener = self.get_output_value("out_RDS_HUB_LISTENER")
-        rds_hub_sender = self.get_output_value("out_RDS_HUB_SENDER")
-        rds_storage_admin = self.get_output_value("out_RDS_STORAGE_ADMIN")
-        rds_storage_reader = self.get_output_value("out_RDS_STORAGE_READER")
-        rds_storage_writer = self.get_output_value("out_RDS_STORAGE_WRITER")
-        host_rds = self.get_output_value("out_HOST_RDS")
-        host_rds_postgres = self.get_output_value("out_HOST_RDS_POSTGRES")
-        spring_application_json = self.get_output_value("out_SPRING_APPLICATION_JSON")
-        secrets = {
-            "API_VERSION": api_version,
-            "ACR_SERVER": acr_server,
-            "ACR_USERNAME": acr_username,
-            "ACR_PASSWORD": acr_password,
-            "ACR_REGISTRY_URL": acr_registry_url,
-            "HOST_COSMOTECH_API": host_cosmotech_api,
-            "IDENTITY_AUTHORIZATION_URL": identity_authorization_url,
-            "IDENTITY_TOKEN_URL": identity_token_url,
-            "MONITORING_NAMESPACE": monitoring_namespace,
-            "NAMESPACE": namespace,
-            "ARGO_SERVICE_ACCOUNT_NAME": argo_service_account_name,
-            "AZURE_TENANT_ID": azure_tenant_id,
-            "AZURE_APPID_URI": azure_appid_uri,
-            "AZURE_STORAGE_ACCOUNT_KEY": azure_storage_account_key,
-            "AZURE_STORAGE_ACCOUNT_NAME": azure_storage_account_name,
-            "AZURE_CREDENTIALS_CLIENT_ID": azure_credentials_client_id,
-            "AZURE_CREDENTIALS_CLIENT_SECRET": azure_credentials_client_secret,
-            "AZURE_CREDENTIALS_CUSTOMER_CLIENT_ID": azure_credentials_customer_client_id,
-            "AZURE_CREDENTIALS_CUSTOMER_CLIENT_SECRET": azure_credentials_customer_client_secret,
-            "ADX_BASE_URI": adx_base_uri,
-            "ADX_INGEST_URI": adx_ingest_uri,
-            "EVENTBUS_BASE_URI": eventbus_base_uri,
-            "HOST_POSTGRES": host_postgres,
-            "HOST_REDIS": host_redis,
-            "HOST_REDIS_PASSWORD": host_redis_password,
-            "HOST_ARGO_WORKFLOWS_SERVER": host_argo_workflows_server,
-            "RDS_HUB_LISTENER": rds_hub_listener,
-            "RDS_HUB_SENDER": rds_hub_sender,
-            "RDS_STORAGE_ADMIN": rds_storage_admin,
-            "RDS_STORAGE_READER": rds_storage_reader,
-            "RDS_STORAGE_WRITER": rds_storage_writer,
-            "HOST_RDS": host_rds,
-            "HOST_RDS_POSTGRES": host_rds_postgres,
-            "SPRING_APPLICATION_JSON": spring_application_json
-        }
-        self.upload_secrets(f"{self.prefix_secrets}/{self.platform_name}-platform-secrets", secrets)
+        payloads = build_payloads(self.mapping, self.secrets.get("outputs", {}))
+        for resource, spec in self.mapping.items():
+            path = resource_path(
+                spec,
+                tenant_id=self.tenant_id,
+                cluster_name=self.cluster_name,
+                platform_name=self.platform_name,
+            )
+            self.upload_secrets(path, payloads[resource])
         return self
@@ -1,7 +1,7 @@
 import logging
 import sys
 import os
-import hvac
+from vault.common.vault_client import get_vault_client
 
 logger = logging.getLogger("Babylon")
 
@@ -40,7 +40,7 @@ class DeletesSecrets:
         self.prefix_secrets = f"{tenant}/cluster/{self.cluster_name}"
 
     def delete_secrets(self):
-        client = hvac.Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
         client.secrets.kv.v2.delete_metadata_and_all_versions(
             path=f"{self.prefix_secrets}/{self.platform_name}-platform-secrets",
             mount_point=self.org_name,
@@ -1,7 +1,7 @@
 import logging
 import sys
 import os
-import hvac
+from vault.common.vault_client import get_vault_client
 
 logger = logging.getLogger("Babylon")
 
@@ -25,7 +25,7 @@ class DisableTenant:
         self.tenant_id = os.environ.get("TENANT_ID")
 
     def disable(self, secret_engine: str = "kv"):
-        client = hvac.Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
         # Disable the secrets engine
         client.sys.disable_secrets_engine(path=secret_engine)
         print('Secrets engine at path "kv" has been disabled.')
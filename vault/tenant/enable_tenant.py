@@ -1,8 +1,8 @@
 import logging
 import sys
 import os
-import hvac
 from hvac.exceptions import InvalidPath, InvalidRequest
+from vault.common.vault_client import get_vault_client
 
 logger = logging.getLogger("Babylon")
 
@@ -27,7 +27,7 @@ class EnableNewTenant:
         self.tenant_id = os.environ.get("TENANT_ID")
 
     def check_and_enable_secrets_engine(self, secret_engine: str = "kv"):
-        client = hvac.Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
         try:
             client.sys.read_mount_configuration(path=secret_engine)
             print(f'Secrets engine at path "{secret_engine}" is already enabled.')
@@ -42,7 +42,7 @@ class EnableNewTenant:
             print(f'Secrets engine at path "{secret_engine}" has been enabled.')
 
     def enable(self, secret_engine: str = "kv"):
-        client = hvac.Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
         try:
             client.sys.enable_secrets_engine(
                 backend_type="kv", path=secret_engine, options={"version": self.version_engine[-1]}
@@ -1,17 +1,22 @@
-import subprocess
 import sys
-import json
 import os
 import logging
-import hvac
 import re
+import threading
+from vault.common.vault_client import get_vault_client
+from vault.user.entities import EntityIndex, lookup_entity_id
+from vault.user.user_index import UserIndex, user_record
 
 logger = logging.getLogger("Babylon")
 
+# Auth mount accessors never change for the life of the process
+_accessors = dict()
+_accessors_lock = threading.Lock()
+
 
 class UserAdd:
 
-    def __init__(self):
+    def __init__(self, entity_index: EntityIndex = None):
         for v in [
                 "VAULT_ADDR",
                 "VAULT_TOKEN",
@@ -24,9 +29,10 @@ class UserAdd:
         self.server_id = os.environ.get("VAULT_ADDR")
         self.token = os.environ.get("VAULT_TOKEN")
         self.org_name = os.environ.get("ORGANIZATION_NAME")
+        self.entity_index = entity_index
 
     def validate_policies(self, policies):
-        client = hvac.Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
         existing_policies = client.sys.list_policies()["policies"]
 
         for policy in policies.split(","):
@@ -44,13 +50,24 @@ class UserAdd:
                 f"Username '{username}' contains special characters. Only alphanumeric characters are allowed.")
 
     def get_accessor(self):
-        result = subprocess.run(["vault", "auth", "list", "-format=json"], capture_output=True, text=True)
-        auth_list = json.loads(result.stdout)
-        accessor = auth_list["userpass-cosmotech/"]["accessor"]
+        mount = f"userpass-{self.org_name}/"
+        key = (self.server_id, mount)
+        with _accessors_lock:
+            if key in _accessors:
+                return _accessors[key]
+        client = get_vault_client(self.server_id, self.token)
+        result = client.sys.list_auth_methods()
+        # Recent hvac versions nest the mounts under "data"
+        auth_list = result.get("data", result)
+        if mount not in auth_list:
+            raise ValueError(f"Auth method '{mount}' is not enabled in Vault.")
+        accessor = auth_list[mount]["accessor"]
+        with _accessors_lock:
+            _accessors[key] = accessor
         return accessor
 
     def create_user(self, username, policies):
-        client = hvac.Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
         client.auth.userpass.create_or_update_user(
             username=username,
             password="foo",
@@ -59,7 +76,7 @@ class UserAdd:
         )
 
     def create_entity(self, username, email, team, policies):
-        client = hvac.Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
         result = client.secrets.identity.create_or_update_entity(
             name=username,
             policies=policies,
@@ -70,24 +87,30 @@ class UserAdd:
             },
         )
 
-        # Check if the entity is created and retrieve its ID
-        if result:
-            entities = client.secrets.identity.list_entities()
-            if entities and "data" in entities:
-                for entity_id in entities["data"]["keys"]:
-                    entity = client.secrets.identity.read_entity(entity_id=entity_id)
-                    if entity and "data" in entity and "name" in entity["data"]:
-                        if entity["data"]["name"] == username:
-                            return entity["data"]["id"]
-        else:
+        # A new entity comes back with its ID, an updated one with no content
+        entity_id = None
+        if isinstance(result, dict):
+            entity_id = result.get("data", {}).get("id")
+        if entity_id is None:
+            entity_id = lookup_entity_id(client, username, self.entity_index)
+        if entity_id is None:
             raise ValueError("Unable to retrieve entity ID after creation. Unexpected response structure.")
+        if self.entity_index is not None:
+            self.entity_index.put(username, entity_id)
+        return entity_id
 
     def add_user_to_entity(self, username, userid, accessor):
-        client = hvac.Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
         client.secrets.identity.create_or_update_entity_alias(name=username,
                                                               canonical_id=userid,
                                                               mount_accessor=accessor)
 
+    def index_users(self, records: list):
+        try:
+            UserIndex().update_entities(records)
+        except Exception as e:
+            logger.warning(f"Failed to update the user index: {str(e)}")
+
     def add_user(self, username, email, team, policies):
         # Validate policies, email, and username
         self.validate_policies(policies)
@@ -99,3 +122,4 @@ class UserAdd:
         userid = self.create_entity(username, email, team, policies)
         print(f"Canonical ID: {userid}")
         self.add_user_to_entity(username, userid, accessor)
+        self.index_users([user_record(userid, username, self.org_name, email, team, policies)])
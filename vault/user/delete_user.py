@@ -2,13 +2,17 @@ import sys
 import os
 import logging
 import hvac
+from concurrent.futures import ThreadPoolExecutor
+from vault.common.vault_client import get_vault_client
+from vault.user.entities import EntityIndex, lookup_entity_id, read_entity_by_name
+from vault.user.user_index import UserIndex
 
 logger = logging.getLogger("Babylon")
 
 
 class UserDelete:
 
-    def __init__(self):
+    def __init__(self, entity_index: EntityIndex = None):
         for v in [
                 "VAULT_ADDR",
                 "VAULT_TOKEN",
@@ -21,9 +25,10 @@ class UserDelete:
         self.server_id = os.environ.get("VAULT_ADDR")
         self.token = os.environ.get("VAULT_TOKEN")
         self.org_name = os.environ.get("ORGANIZATION_NAME")
+        self.entity_index = entity_index
 
     def user_exists(self, username):
-        client = hvac.Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
 
         # Check if user exists in userpass authentication method
         try:
@@ -34,15 +39,7 @@ class UserDelete:
                 userpass_exists = False
 
             # Check if user exists in identity engine
-            identity_exists = False
-            entities = client.secrets.identity.list_entities()
-            if entities and "data" in entities:
-                for eid in entities["data"]["keys"]:
-                    entity = client.secrets.identity.read_entity(entity_id=eid)
-                    if entity and "data" in entity:
-                        if entity["data"]["name"] == username:
-                            identity_exists = True
-                            break
+            identity_exists = lookup_entity_id(client, username, self.entity_index) is not None
 
             return userpass_exists or identity_exists
 
@@ -54,7 +51,7 @@ class UserDelete:
             return False
 
     def delete_user(self, username):
-        client = hvac.Client(url=self.server_id, token=self.token)
+        client = get_vault_client(self.server_id, self.token)
 
         if self.user_exists(username):
             # Delete the user from the userpass auth method
@@ -65,32 +62,30 @@ class UserDelete:
                 print(f'User "{username}" not found in userpass authentication method.')
 
             # Retrieve and delete the associated identity entity and alias
-            entities = client.secrets.identity.list_entities()
-            entity_id = None
-            if entities and "data" in entities:
-                for eid in entities["data"]["keys"]:
-                    entity = client.secrets.identity.read_entity(entity_id=eid)
-                    if entity and "data" in entity:
-                        if entity["data"]["name"] == username:
-                            entity_id = eid
-                            break
-
-            if entity_id:
-                # Delete any aliases associated with the entity
-                aliases = client.secrets.identity.list_entity_aliases()
-                if aliases and "data" in aliases:
-                    for alias_id in aliases["data"]["keys"]:
-                        alias = client.secrets.identity.read_entity_alias(alias_id=alias_id)
-                        if alias and "data" in alias:
-                            if alias["data"]["canonical_id"] == entity_id:
-                                client.secrets.identity.delete_entity_alias(alias_id=alias_id)
-                                print("""
-Alias "{alias["data"]["name"]}" associated with user "{username}" has been deleted.
-""")
+            entity = read_entity_by_name(client, username)
+
+            if entity:
+                entity_id = entity["id"]
+                # The entity read already lists its aliases, delete them together
+                aliases = entity.get("aliases") or []
+                with ThreadPoolExecutor(max_workers=max(1, min(len(aliases), 8))) as executor:
+                    list(executor.map(
+                        lambda alias: client.secrets.identity.delete_entity_alias(alias_id=alias["id"]),
+                        aliases,
+                    ))
+                for alias in aliases:
+                    print(f'Alias "{alias["name"]}" associated with user "{username}" has been deleted.')
 
                 # Delete the entity itself
                 client.secrets.identity.delete_entity(entity_id=entity_id)
+                if self.entity_index is not None:
+                    self.entity_index.forget(username)
                 print(f'Entity associated with user "{username}" has been deleted.')
 
             else:
                 print(f'No identity entity found for user "{username}".')
+
+            try:
+                UserIndex().remove_entity(username)
+            except Exception as e:
+                logger.warning(f"Failed to update the user index: {str(e)}")
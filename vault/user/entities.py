@@ -0,0 +1,52 @@
+import threading
+import hvac
+
+
+def read_entity_by_name(client, name: str):
+    """
+    Returns the data of the identity entity called name, or None if there is
+    no such entity. Vault answers an unknown name with an empty 204 response.
+    """
+    try:
+        response = client.secrets.identity.read_entity_by_name(name=name)
+    except hvac.exceptions.InvalidPath:
+        return None
+    if not isinstance(response, dict):
+        return None
+    return response.get("data")
+
+
+class EntityIndex:
+    """
+    Name -> entity ID index shared by batch user operations, so each entity
+    is resolved at most once per run. Only found entities are cached.
+    """
+
+    def __init__(self):
+        self._ids = dict()
+        self._lock = threading.Lock()
+
+    def get(self, client, name: str):
+        with self._lock:
+            if name in self._ids:
+                return self._ids[name]
+        entity = read_entity_by_name(client, name)
+        if not entity:
+            return None
+        self.put(name, entity["id"])
+        return entity["id"]
+
+    def put(self, name: str, entity_id: str):
+        with self._lock:
+            self._ids[name] = entity_id
+
+    def forget(self, name: str):
+        with self._lock:
+            self._ids.pop(name, None)
+
+
+def lookup_entity_id(client, name: str, index: EntityIndex = None):
+    if index is not None:
+        return index.get(client, name)
+    entity = read_entity_by_name(client, name)
+    return entity["id"] if entity else None
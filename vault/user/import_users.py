@@ -0,0 +1,131 @@
+import os
+import csv
+import logging
+import yaml
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from vault.common.vault_client import get_vault_client
+from vault.user.add_user import UserAdd
+from vault.user.entities import EntityIndex
+from vault.user.user_index import user_record
+
+logger = logging.getLogger("Babylon")
+
+
+def read_roster(file_path: str):
+    """
+    Reads the users to provision from a CSV file with a header line, or from
+    a YAML list of users (optionally under a `users` key). Each user has a
+    username, email, team and policies, given as a list or a comma-separated
+    string.
+    """
+    if file_path.lower().endswith(".csv"):
+        with open(file_path, "r", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(file_path, "r") as f:
+            rows = yaml.safe_load(f) or []
+        if isinstance(rows, dict):
+            rows = rows.get("users") or []
+    if not isinstance(rows, list):
+        raise ValueError(f"Roster {file_path} must contain a list of users.")
+    users = []
+    for row in rows:
+        if not isinstance(row, dict):
+            # Reported as invalid with the other rows instead of aborting the import
+            users.append(
+                dict(username="", email="", team="", policies="", error=f"Not a user entry: {row!r}")
+            )
+            continue
+        policies = row.get("policies") or ""
+        if isinstance(policies, list):
+            policies = ",".join(str(p) for p in policies)
+        policies = str(policies)
+        users.append(
+            dict(
+                username=str(row.get("username") or "").strip(),
+                email=str(row.get("email") or "").strip(),
+                team=str(row.get("team") or "").strip(),
+                policies=",".join(p.strip() for p in policies.split(",") if p.strip()),
+            )
+        )
+    return users
+
+
+class UserImport:
+
+    def __init__(self):
+        self.entity_index = EntityIndex()
+        self.useradd = UserAdd(entity_index=self.entity_index)
+        self.server_id = self.useradd.server_id
+        self.token = self.useradd.token
+
+    def validate_user(self, user: dict, existing_policies: list):
+        if "error" in user:
+            raise ValueError(user["error"])
+        for field in ["username", "email", "team", "policies"]:
+            if not user[field]:
+                raise ValueError(f"Missing {field}")
+        self.useradd.validate_username(user["username"])
+        self.useradd.validate_email(user["email"])
+        for policy in user["policies"].split(","):
+            if policy not in existing_policies:
+                raise ValueError(f"Policy '{policy}' does not exist in Vault.")
+
+    def provision_user(self, user: dict, accessor: str):
+        self.useradd.create_user(user["username"], user["policies"])
+        userid = self.useradd.create_entity(user["username"], user["email"], user["team"], user["policies"])
+        self.useradd.add_user_to_entity(user["username"], userid, accessor)
+        return userid
+
+    def import_users(self, roster_file: str, parallel: int = 8):
+        if not os.path.exists(roster_file):
+            print(f"Roster file {roster_file} does not exist.")
+            return None
+        users = read_roster(roster_file)
+        client = get_vault_client(self.server_id, self.token)
+        existing_policies = client.sys.list_policies()["policies"]
+
+        # Every row is checked before anything is written to Vault
+        report = dict()
+        valid = []
+        for row, user in enumerate(users, start=1):
+            name = user["username"] or f"<row {row}>"
+            try:
+                if user["username"] in report:
+                    name = f"{user['username']} (row {row})"
+                    raise ValueError("Duplicate username in roster")
+                self.validate_user(user, existing_policies)
+                valid.append(user)
+                report[name] = "pending"
+            except ValueError as e:
+                report[name] = f"invalid: {str(e)}"
+
+        records = []
+        if valid:
+            accessor = self.useradd.get_accessor()
+            with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+                futures = {executor.submit(self.provision_user, user, accessor): user for user in valid}
+                for future in as_completed(futures):
+                    user = futures[future]
+                    username = user["username"]
+                    try:
+                        userid = future.result()
+                        report[username] = f"created ({userid})"
+                        records.append(
+                            user_record(
+                                userid, username, self.useradd.org_name, user["email"], user["team"], user["policies"]
+                            )
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to provision user {username}: {str(e)}")
+                        report[username] = f"failed: {str(e)}"
+
+        if records:
+            self.useradd.index_users(records)
+
+        for username, status in report.items():
+            print(f"{username}: {status}")
+        created = sum(1 for status in report.values() if status.startswith("created"))
+        invalid = sum(1 for status in report.values() if status.startswith("invalid"))
+        print(f"Summary: {created} created, {invalid} invalid, {len(report) - created - invalid} failed")
+        return report
@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import hashlib
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from vault.common.vault_client import get_vault_client
+
+logger = logging.getLogger("Babylon")
+
+
+def user_record(entity_id: str, username: str, org_name: str, email: str, team: str, policies: str):
+    """
+    Returns the index entry of a user provisioned by this tool.
+    """
+    return dict(
+        id=entity_id,
+        name=username,
+        metadata={"organization": org_name, "team": team, "email": email},
+        policies=[p for p in policies.split(",") if p],
+        aliases=[username],
+        last_update_time=None,
+    )
+
+
+class UserIndex:
+    """
+    Local index of the identity entities of a Vault server.
+
+    The index is built from one concurrent sweep of the entities and kept in
+    a cache file, so listing and searching users costs no Vault call. A
+    refresh lists the entities once and only reads the ones that are new or
+    whose name or aliases changed: the entity list carries nothing else, so
+    metadata edited outside this tool needs a full rebuild. Users added or
+    deleted by this tool are written through to the index.
+    """
+
+    def __init__(self, index_file: str = None, parallel: int = 16):
+        for v in [
+                "VAULT_ADDR",
+                "VAULT_TOKEN",
+                "ORGANIZATION_NAME",
+        ]:
+            if v not in os.environ:
+                logger.error(f" {v} is missing")
+                sys.exit(1)
+
+        self.server_id = os.environ.get("VAULT_ADDR")
+        self.token = os.environ.get("VAULT_TOKEN")
+        self.org_name = os.environ.get("ORGANIZATION_NAME")
+        self.parallel = parallel
+        if index_file is None:
+            directory = os.environ.get(
+                "TFSTATE_CACHE_DIR",
+                os.path.join(os.path.expanduser("~"), ".cache", "backend-tf-state-to-vault"),
+            )
+            server = hashlib.sha256(self.server_id.encode("utf-8")).hexdigest()[:16]
+            # Own subdirectory, the state cache evicts the entries next to it
+            index_file = os.path.join(directory, "users", f"users.{server}.json")
+        self.index_file = index_file
+
+    def load(self):
+        try:
+            with open(self.index_file, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable user index {self.index_file}: {str(e)}")
+            return None
+
+    def save(self, entities: dict):
+        # Entities hold emails, keep the file private to the current user
+        directory = os.path.dirname(os.path.abspath(self.index_file))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entities, f)
+        os.replace(tmp, self.index_file)
+
+    def _read_entity(self, client, entity_id: str):
+        try:
+            data = client.secrets.identity.read_entity(entity_id=entity_id)["data"]
+        except Exception as e:
+            logger.warning(f"Failed to read entity {entity_id}: {str(e)}")
+            return None
+        return dict(
+            id=data["id"],
+            name=data.get("name"),
+            metadata=data.get("metadata") or {},
+            policies=data.get("policies") or [],
+            aliases=[alias.get("name") for alias in data.get("aliases") or []],
+            last_update_time=data.get("last_update_time"),
+        )
+
+    @staticmethod
+    def _changed(info: dict, entity: dict):
+        # The entity list only reports the name and aliases of each entity
+        if "name" in info and info["name"] != entity["name"]:
+            return True
+        if "aliases" in info:
+            aliases = sorted(alias.get("name") for alias in info["aliases"] or [])
+            return aliases != sorted(entity["aliases"])
+        return False
+
+    def refresh(self, full: bool = False):
+        client = get_vault_client(self.server_id, self.token)
+        entities = dict() if full else (self.load() or {})
+        try:
+            response = client.secrets.identity.list_entities()
+            listed = response["data"].get("key_info") or {key: {} for key in response["data"]["keys"]}
+        except Exception as e:
+            logger.error(f"Failed to list entities: {str(e)}")
+            return entities
+
+        stale = [
+            entity_id
+            for entity_id, info in listed.items()
+            if entity_id not in entities or self._changed(info, entities[entity_id])
+        ]
+        removed = [entity_id for entity_id in entities if entity_id not in listed]
+        for entity_id in removed:
+            del entities[entity_id]
+        with ThreadPoolExecutor(max_workers=max(1, self.parallel)) as executor:
+            for entity_id, entity in zip(stale, executor.map(lambda e: self._read_entity(client, e), stale)):
+                if entity is not None:
+                    entities[entity_id] = entity
+        self.save(entities)
+        logger.info(f"User index refreshed: {len(stale)} read, {len(removed)} removed, {len(entities)} entities")
+        return entities
+
+    def update_entities(self, entities: list):
+        """
+        Writes entities created or updated by this tool to the index, if it
+        has been built.
+        """
+        indexed = self.load()
+        if indexed is None:
+            return
+        for entity in entities:
+            indexed[entity["id"]] = entity
+        self.save(indexed)
+
+    def remove_entity(self, name: str):
+        indexed = self.load()
+        if indexed is None:
+            return
+        self.save({entity_id: entity for entity_id, entity in indexed.items() if entity["name"] != name})
+
+    def entities(self, refresh: bool = False, full: bool = False):
+        entities = None if refresh or full else self.load()
+        if entities is None:
+            entities = self.refresh(full=full)
+        return entities
+
+    def find(self, team: str = None, email: str = None, refresh: bool = False, full: bool = False):
+        users = []
+        for entity in self.entities(refresh=refresh, full=full).values():
+            metadata = entity["metadata"]
+            if metadata.get("organization") != self.org_name:
+                continue
+            if team is not None and metadata.get("team") != team:
+                continue
+            if email is not None and (metadata.get("email") or "").lower() != email.lower():
+                continue
+            users.append(entity)
+        return sorted(users, key=lambda entity: entity["name"] or "")
+
+    def print_users(self, users: list):
+        for entity in users:
+            metadata = entity["metadata"]
+            print(f"{entity['name']}\t{metadata.get('email', '')}\t{metadata.get('team', '')}\t{entity['id']}")
+        print(f"{len(users)} user(s) in organization {self.org_name}")